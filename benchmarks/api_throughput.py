@@ -0,0 +1,88 @@
+"""Пропускная способность JSON API против HTML-страниц.
+
+На отдельной базе с тестовыми постами одни и те же данные
+запрашиваются через HTML-вьюхи и через /api/v1/ тестовым клиентом
+Django в одном процессе, без сети. Для каждой пары печатаются
+запросы в секунду, размер ответа и число SQL-запросов.
+
+    python -m benchmarks.api_throughput --requests 500
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.utils import print_table, setup_django, write_results
+
+
+def pages(author, post_id):
+    return {
+        'index': ('/', '/api/v1/posts/'),
+        'profile': (
+            f'/profile/{author}/', f'/api/v1/profiles/{author}/posts/'
+        ),
+        'post': (f'/posts/{post_id}/', f'/api/v1/posts/{post_id}/'),
+    }
+
+
+def measure(client, url, requests):
+    from django.db import connection
+
+    # CaptureQueriesContext не подходит: request_started сбрасывает
+    # журнал запросов соединения.
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    response = client.get(url)
+    assert response.status_code == 200, (url, response.status_code)
+    with connection.execute_wrapper(count):
+        client.get(url)
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get(url)
+    elapsed = time.perf_counter() - started
+    return {
+        'requests_per_sec': round(requests / elapsed, 1),
+        'bytes': len(response.content),
+        'queries': len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    os.environ['BENCHMARK_DB'] = os.path.join(directory, 'db.sqlite3')
+    setup_django('benchmarks.settings')
+    from django.test import Client
+
+    from benchmarks.concurrency import populate
+    from posts.models import Post
+
+    results = []
+    try:
+        populate(args.posts, users=20)
+        post = Post.objects.select_related('author').latest('pk')
+        client = Client()
+        for name, urls in pages(post.author.username, post.pk).items():
+            for kind, url in zip(('html', 'api'), urls):
+                results.append({
+                    'page': name,
+                    'kind': kind,
+                    **measure(client, url, args.requests),
+                })
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print_table(results, list(results[0]))
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Сравнение бэкендов кэша под несколькими процессами-воркерами.
+
+Каждый воркер читает общий набор ключей и досчитывает отсутствующие,
+как делают фрагменты лент, и увеличивает общий счётчик, как поколение
+лент. Для каждого бэкенда печатаются операции в секунду, доля
+попаданий и итог счётчика: у LocMemCache у каждого воркера свой кэш,
+поэтому попаданий меньше, а счётчик не сходится.
+
+    python -m benchmarks.cache_backends --workers 4 --operations 5000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.utils import print_table, setup_django, write_results
+
+BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'filebased': (
+        'django.core.cache.backends.filebased.FileBasedCache', 'files'
+    ),
+    'sqlite': ('core.cache.SQLiteCache', 'cache.sqlite3'),
+}
+VALUE = 'x' * 2048
+
+
+def make_cache(backend, location):
+    from django.utils.module_loading import import_string
+    cache_class = import_string(backend)
+    return cache_class(location, {'OPTIONS': {'MAX_ENTRIES': 100000}})
+
+
+def worker(backend, location, operations, keys, results):
+    setup_django()
+    cache = make_cache(backend, location)
+    hits = 0
+    started = time.perf_counter()
+    for _ in range(operations):
+        key = f'fragment:{random.randrange(keys)}'
+        if cache.get(key) is None:
+            cache.set(key, VALUE)
+        else:
+            hits += 1
+        try:
+            cache.incr('generation')
+        except ValueError:
+            cache.add('generation', 1)
+    results.put((hits, time.perf_counter() - started))
+
+
+def run(name, workers, operations, keys):
+    backend, location = BACKENDS[name]
+    directory = tempfile.mkdtemp()
+    location = os.path.join(directory, location) if location else name
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=worker,
+            args=(backend, location, operations, keys, results),
+        )
+        for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+    generation = make_cache(backend, location).get('generation')
+    shutil.rmtree(directory, ignore_errors=True)
+    total = workers * operations
+    return {
+        'backend': name,
+        'ops_per_sec': round(total * 2 / elapsed),
+        'hit_rate': round(sum(hits for hits, _ in measured) / total, 3),
+        'generation': generation,
+        'expected_generation': total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--operations', type=int, default=5000)
+    parser.add_argument('--keys', type=int, default=500)
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS))
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+    setup_django()
+    results = [
+        run(name, args.workers, args.operations, args.keys)
+        for name in args.backends
+    ]
+    print_table(results, list(results[0]))
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Пропускная способность одного процесса под WSGI и ASGI.
+
+Поднимает сервер на отдельной базе с тестовыми постами и держит
+--connections одновременных клиентов, которые по кругу запрашивают
+ленты и страницы постов. Сравниваются gunicorn с одним синхронным
+воркером, gunicorn с потоками и uvicorn с yatube.asgi. --slow-ms
+добавляет каждому запросу блокирующую задержку, как у медленного
+вызова БД или картинок.
+
+    python -m benchmarks.concurrency --connections 200 --slow-ms 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import (BASE_DIR, PROJECT_DIR, percentile, print_table,
+                              setup_django, write_results)
+
+SERVERS = {
+    'wsgi-sync': [
+        '-m', 'gunicorn', '--workers', '1',
+        '--bind', '127.0.0.1:{port}', 'yatube.wsgi:application',
+    ],
+    'wsgi-threads': [
+        '-m', 'gunicorn', '--workers', '1', '--threads', '{threads}',
+        '--bind', '127.0.0.1:{port}', 'yatube.wsgi:application',
+    ],
+    'asgi': [
+        '-m', 'uvicorn', '--workers', '1', '--port', '{port}',
+        '--log-level', 'warning', '--no-access-log', 'yatube.asgi:application',
+    ],
+}
+
+
+def populate(posts, users):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from posts import counters, rendering
+    from posts.models import Group, Post
+
+    call_command('migrate', verbosity=0)
+    User = get_user_model()
+    authors = [
+        User.objects.create_user(username=f'author{number}')
+        for number in range(users)
+    ]
+    group = Group.objects.create(title='Группа', slug='group')
+    Post.objects.bulk_create(
+        Post(
+            author=random.choice(authors),
+            group=group,
+            text=f'Пост номер {number}',
+        )
+        for number in range(posts)
+    )
+    rendering.backfill(Post)
+    counters.reconcile()
+    return [
+        '/',
+        '/?page=2',
+        '/group/group/',
+        f'/profile/{authors[0].username}/',
+        *(f'/posts/{pk}/' for pk in Post.objects.values_list('pk', flat=True)[
+            :20
+        ]),
+    ]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Сервер не поднялся на порту {port}')
+
+
+async def fetch(port, path, method='GET', body=b'', headers=()):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = ''.join(f'{header}\r\n' for header in headers)
+    if body:
+        head += (
+            'Content-Type: application/x-www-form-urlencoded\r\n'
+            f'Content-Length: {len(body)}\r\n'
+        )
+    writer.write(
+        f'{method} {path} HTTP/1.1\r\nHost: localhost\r\n'
+        f'Connection: close\r\n{head}\r\n'.encode() + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+async def load(port, paths, connections, duration):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def client():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                status = await fetch(port, random.choice(paths))
+            except (OSError, IndexError, ValueError):
+                status = None
+            if status != 200:
+                errors += 1
+                continue
+            latencies.append(time.monotonic() - started)
+
+    started = time.monotonic()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    return latencies, errors, time.monotonic() - started
+
+
+def run(name, paths, env, args):
+    port = free_port()
+    command = [
+        sys.executable,
+        *(part.format(port=port, threads=args.threads)
+          for part in SERVERS[name]),
+    ]
+    server = subprocess.Popen(
+        command, cwd=PROJECT_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        latencies, errors, elapsed = asyncio.run(
+            load(port, paths, args.connections, args.duration)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        'server': name,
+        'connections': args.connections,
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--slow-ms', type=int, default=0)
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--servers', nargs='+', default=list(SERVERS))
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'benchmarks.settings',
+        'BENCHMARK_DB': os.path.join(directory, 'db.sqlite3'),
+        'BENCHMARK_SLOW_MS': str(args.slow_ms or ''),
+        'ASGI_THREADS': str(args.threads),
+        'PYTHONPATH': os.pathsep.join((BASE_DIR, PROJECT_DIR)),
+    }
+    os.environ.update(env)
+    setup_django('benchmarks.settings')
+    try:
+        paths = populate(args.posts, users=20)
+        results = [run(name, paths, env, args) for name in args.servers]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print_table(results, list(results[0]))
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
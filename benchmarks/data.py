@@ -0,0 +1,272 @@
+"""Быстрый генератор синтетических данных для бенчмарков.
+
+Пишет пользователей, группы, посты, подписки и комментарии прямыми
+INSERT пачками через executemany, без моделей и сигналов, а затем
+один раз пересчитывает счётчики, ленты подписок и поисковый индекс.
+Активность неравномерна, как у настоящих сайтов: авторы, группы
+и посты выбираются по закону Ципфа с показателем --skew, поэтому
+у самых популярных авторов тысячи подписчиков, а у большинства —
+единицы.
+
+    python -m benchmarks.data /tmp/bench.sqlite3 --posts 1000000 \\
+        --users 100000 --follows 50
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+from datetime import timedelta
+
+from benchmarks.utils import setup_django
+
+BATCH_SIZE = 10000
+
+
+def zipf_weights(count, skew):
+    '''Накопленные веса для random.choices: i-й элемент ∝ 1 / i**skew.'''
+    return list(itertools.accumulate(
+        1 / rank ** skew for rank in range(1, count + 1)
+    ))
+
+
+def batches(rows, size=BATCH_SIZE):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert(cursor, sql, rows):
+    for batch in batches(rows):
+        cursor.executemany(sql, batch)
+
+
+def fill_timelines(cursor, backfill, fanout_limit):
+    '''То же, что timeline.rebuild(), парой INSERT ... SELECT.'''
+    # Последние посты авторов собираются во временную таблицу
+    # с индексом: подзапрос с оконной функцией в JOIN SQLite
+    # пересчитывал бы для каждой подписки.
+    cursor.execute(
+        '''
+        CREATE TEMP TABLE recent_posts AS
+        SELECT id, author_id, pub_date FROM (
+            SELECT id, author_id, pub_date, row_number() OVER (
+                PARTITION BY author_id ORDER BY pub_date DESC, id DESC
+            ) AS position
+            FROM posts_post
+        )
+        WHERE position <= %s
+        ''',
+        [backfill],
+    )
+    cursor.execute(
+        'CREATE INDEX temp.recent_posts_author ON recent_posts (author_id)'
+    )
+    # Вторичные индексы дешевле построить один раз после заливки,
+    # чем обновлять на каждой из миллионов строк; строки идут в порядке
+    # уникального (user, post), который удалить нельзя.
+    cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+        "AND tbl_name = 'posts_timelineentry' AND sql IS NOT NULL"
+    )
+    indexes = cursor.fetchall()
+    for name, _ in indexes:
+        cursor.execute(f'DROP INDEX "{name}"')
+    cursor.execute('DELETE FROM posts_timelineentry')
+    cursor.execute(
+        '''
+        INSERT INTO posts_timelineentry (user_id, post_id, author_id, pub_date)
+        SELECT follow.user_id, post.id, post.author_id, post.pub_date
+        FROM posts_follow AS follow
+        JOIN posts_authorstats AS stats ON stats.user_id = follow.author_id
+        JOIN recent_posts AS post ON post.author_id = follow.author_id
+        WHERE stats.followers_count <= %s
+        ORDER BY follow.user_id, post.id
+        ''',
+        [fanout_limit],
+    )
+    for _, sql in indexes:
+        cursor.execute(sql)
+    cursor.execute('DROP TABLE temp.recent_posts')
+
+
+def post_rows(count, user_ids, group_ids, skew, started, step, adapt):
+    from posts.rendering import rendered
+
+    author_weights = zipf_weights(len(user_ids), skew)
+    group_weights = zipf_weights(len(group_ids), skew)
+    for number in range(count):
+        date = adapt(started + step * number)
+        author_id, = random.choices(user_ids, cum_weights=author_weights)
+        # Примерно треть постов без группы.
+        group_id = None
+        if group_ids and random.random() > 0.3:
+            group_id, = random.choices(group_ids, cum_weights=group_weights)
+        # От 6 до 72 слов: часть постов длиннее анонса.
+        text = f'Пост {number} о том и о сём ' * random.randint(1, 12)
+        yield (
+            text, date, date, author_id, group_id,
+            *rendered(text).values(),
+        )
+
+
+def follow_rows(user_ids, follows, skew):
+    author_weights = zipf_weights(len(user_ids), skew)
+    for user_id in user_ids:
+        authors = set(random.choices(
+            user_ids, cum_weights=author_weights, k=follows
+        ))
+        authors.discard(user_id)
+        for author_id in authors:
+            yield user_id, author_id
+
+
+def comment_rows(count, post_ids, user_ids, skew, created):
+    # Чаще всего комментируют свежие посты.
+    post_ids = sorted(post_ids, reverse=True)
+    post_weights = zipf_weights(len(post_ids), skew)
+    for number in range(count):
+        post_id, = random.choices(post_ids, cum_weights=post_weights)
+        yield (
+            post_id, random.choice(user_ids), f'Комментарий {number}',
+            created,
+        )
+
+
+def column(cursor, sql):
+    cursor.execute(sql)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def generate(posts, users, groups=20, follows=20, comments=0, skew=1.1,
+             days=365, seed=0):
+    '''Заполняет пустую базу и возвращает самые нагруженные объекты.'''
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from posts import counters, search
+
+    random.seed(seed)
+    call_command('migrate', verbosity=0)
+    adapt = connection.ops.adapt_datetimefield_value
+    now = timezone.now()
+    started = now - timedelta(days=days)
+    step = timedelta(days=days) / max(posts, 1)
+    with connection.cursor() as cursor:
+        # База одноразовая: журнал и fsync только замедляют заливку.
+        cursor.execute('PRAGMA journal_mode = OFF')
+        cursor.execute('PRAGMA synchronous = OFF')
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Индекс поиска строится одним проходом после заливки, поэтому
+        # триггеры posts_post снимаются и затем создаются заново.
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = 'posts_post'"
+        )
+        triggers = cursor.fetchall()
+        for name, _ in triggers:
+            cursor.execute(f'DROP TRIGGER {name}')
+        insert(
+            cursor,
+            'INSERT INTO auth_user (password, is_superuser, username, '
+            'first_name, last_name, email, is_staff, is_active, '
+            "date_joined) VALUES ('!', 0, %s, '', '', '', 0, 1, %s)",
+            ((f'user{number}', adapt(started)) for number in range(users)),
+        )
+        insert(
+            cursor,
+            'INSERT INTO posts_group (title, slug, description, posts_count) '
+            "VALUES (%s, %s, '', 0)",
+            ((f'Группа {number}', f'group{number}')
+             for number in range(groups)),
+        )
+        user_ids = column(cursor, 'SELECT id FROM auth_user ORDER BY id')
+        group_ids = column(cursor, 'SELECT id FROM posts_group ORDER BY id')
+        insert(
+            cursor,
+            'INSERT INTO posts_post (text, pub_date, updated, author_id, '
+            'group_id, excerpt, excerpt_truncated, text_html, image, '
+            "comments_count) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, '', 0)",
+            post_rows(posts, user_ids, group_ids, skew, started, step, adapt),
+        )
+        insert(
+            cursor,
+            'INSERT OR IGNORE INTO posts_follow (user_id, author_id) '
+            'VALUES (%s, %s)',
+            follow_rows(user_ids, follows, skew),
+        )
+        if comments:
+            insert(
+                cursor,
+                'INSERT INTO posts_comment (post_id, author_id, text, '
+                'created) VALUES (%s, %s, %s, %s)',
+                comment_rows(
+                    comments, column(cursor, 'SELECT id FROM posts_post'),
+                    user_ids, skew, adapt(now),
+                ),
+            )
+        for _, sql in triggers:
+            cursor.execute(sql)
+    counters.reconcile()
+    with transaction.atomic(), connection.cursor() as cursor:
+        fill_timelines(
+            cursor,
+            settings.TIMELINE_BACKFILL_SIZE,
+            settings.TIMELINE_FANOUT_LIMIT,
+        )
+    search.rebuild(BATCH_SIZE)
+    return hottest()
+
+
+def hottest():
+    '''Самые нагруженные объекты базы для запросов бенчмарка.'''
+    from posts.models import AuthorStats, Group, Post
+
+    return {
+        'author': AuthorStats.objects.order_by('-posts_count').values_list(
+            'user__username', flat=True
+        ).first(),
+        'group': Group.objects.order_by('-posts_count').values_list(
+            'slug', flat=True
+        ).first(),
+        'post': Post.objects.order_by('-comments_count').values_list(
+            'pk', flat=True
+        ).first(),
+        'follower': AuthorStats.objects.order_by(
+            '-following_count'
+        ).values_list('user__username', flat=True).first(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path', help='файл базы SQLite, будет создан')
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--follows', type=int, default=20,
+                        help='подписок на пользователя')
+    parser.add_argument('--comments', type=int, default=50000)
+    parser.add_argument('--skew', type=float, default=1.1,
+                        help='показатель закона Ципфа')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if os.path.exists(args.path):
+        parser.error(f'{args.path} уже существует')
+    os.environ['BENCHMARK_DB'] = os.path.abspath(args.path)
+    setup_django('benchmarks.settings')
+    started = time.perf_counter()
+    hot = generate(
+        args.posts, args.users, args.groups, args.follows, args.comments,
+        args.skew, seed=args.seed,
+    )
+    print(f'Готово за {time.perf_counter() - started:.1f} с: {hot}')
+
+
+if __name__ == '__main__':
+    main()
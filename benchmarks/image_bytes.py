@@ -0,0 +1,138 @@
+"""Байты картинок на страницу ленты для разных клиентов.
+
+Строит миниатюры THUMBNAIL_GEOMETRIES['feed'] для набора синтетических
+картинок (фото, PNG и GIF) и для каждого клиента выбирает вариант так,
+как это делает браузер по srcset и sizes: самый узкий кандидат, ширина
+которого не меньше ширины слота с учётом плотности пикселей. Строка
+«до» — прежняя единственная миниатюра 960x339 в JPEG.
+
+    python -m benchmarks.image_bytes --images 30
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+from benchmarks.utils import print_table, setup_django, write_results
+
+# Имя, ширина окна, ширина слота по sizes, плотность, поддержка WebP.
+CLIENTS = (
+    ('mobile', 360, 360, 2, True),
+    ('mobile-1x', 360, 360, 1, True),
+    ('tablet', 768, 690, 1, True),
+    ('desktop', 1440, 1110, 1, True),
+    ('desktop-no-webp', 1440, 1110, 1, False),
+)
+
+
+def make_images(directory, count):
+    from PIL import Image, ImageDraw
+
+    names = []
+    for number in range(count):
+        width, height = random.choice(((1600, 1200), (1200, 800), (800, 800)))
+        # Плавный фон, фигуры и немного шума — грубое подобие фото.
+        gradient = Image.linear_gradient('L').resize((width, height))
+        image = Image.merge('RGB', (
+            gradient,
+            gradient.rotate(90),
+            Image.new('L', (width, height), random.randrange(256)),
+        ))
+        draw = ImageDraw.Draw(image)
+        for _ in range(20):
+            x, y = random.randrange(width), random.randrange(height)
+            draw.ellipse(
+                (x, y, x + width // 4, y + height // 4),
+                fill=tuple(random.randrange(256) for _ in range(3)),
+            )
+        noise = Image.effect_noise((width, height), 20).convert('RGB')
+        image = Image.blend(image, noise, 0.1)
+        format_ = ('JPEG', 'PNG', 'GIF')[number % 3]
+        if format_ == 'GIF':
+            image = image.convert('P', palette=Image.ADAPTIVE)
+        name = f'posts/sample{number}.{format_.lower()}'
+        image.save(os.path.join(directory, name), format_)
+        names.append(name)
+    return names
+
+
+def pick(candidates, slot, density):
+    '''Ширина варианта, который выберет браузер по srcset.'''
+    needed = slot * density
+    widths = sorted(candidates)
+    return next((width for width in widths if width >= needed), widths[-1])
+
+
+def measure(names, per_page):
+    from django.conf import settings
+    from sorl.thumbnail import default
+
+    from posts import thumbnails
+
+    config = settings.THUMBNAIL_GEOMETRIES['feed']
+    sizes = {}
+    for name in names:
+        for format_, width, _, geometry, options in thumbnails.variants(
+            'feed'
+        ):
+            thumbnail = thumbnails.get_backend().get_thumbnail(
+                name, geometry, **options
+            )
+            sizes.setdefault((format_, width), []).append(
+                default.storage.size(thumbnail.name)
+            )
+        thumbnail = thumbnails.get_backend().get_thumbnail(
+            name, '960x339', crop='center', upscale=True, format='JPEG'
+        )
+        sizes.setdefault(('before', 960), []).append(
+            default.storage.size(thumbnail.name)
+        )
+
+    def per_feed_page(key):
+        return round(sum(sizes[key]) / len(sizes[key]) * per_page)
+
+    before = per_feed_page(('before', 960))
+    results = []
+    for client, viewport, slot, density, webp in CLIENTS:
+        format_ = config['formats'][0] if webp else config['formats'][-1]
+        width = pick(config['widths'], slot, density)
+        page_bytes = per_feed_page((format_, width))
+        results.append({
+            'client': client,
+            'viewport': viewport,
+            'variant': f'{format_.lower()}-{width}',
+            'bytes_per_page': page_bytes,
+            'before_bytes': before,
+            'saved': f'{1 - page_bytes / before:.0%}',
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', type=int, default=30)
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+    setup_django()
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    media_root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(media_root, 'posts'))
+    database_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        with override_settings(MEDIA_ROOT=media_root):
+            names = make_images(media_root, args.images)
+            results = measure(names, settings.POSTS_0N_PAGE)
+    finally:
+        connection.creation.destroy_test_db(database_name, verbosity=0)
+        shutil.rmtree(media_root, ignore_errors=True)
+    print_table(results, list(results[0]))
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+import os
+import time
+
+
+class SlowCallMiddleware:
+    '''Блокирующая задержка в каждом запросе, как у медленного вызова.'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.delay = int(os.environ['BENCHMARK_SLOW_MS']) / 1000
+
+    def __call__(self, request):
+        time.sleep(self.delay)
+        return self.get_response(request)
@@ -0,0 +1,208 @@
+"""Задержка, запросы и память вьюх постов на большой базе.
+
+Каждая вьюха (index, group_posts, profile, post_detail, follow_index)
+запрашивается тестовым клиентом Django в одном процессе на разной
+глубине ленты: первая страница, десятая, сотая. Для каждой точки
+печатаются p50/p95/p99 задержки, число SQL-запросов и пик памяти
+Python на запрос. Кэш по умолчанию отключён, чтобы мерить сами
+вьюхи; --pagination переключает все ленты на offset или cursor.
+
+База берётся из --db (готовится benchmarks.data) или генерируется
+во временный файл по --posts/--users/--follows/--comments. --output
+пишет результаты в JSON вместе с коммитом, --baseline сравнивает
+с такими результатами другого коммита:
+
+    python -m benchmarks.data /tmp/bench.sqlite3 --posts 1000000 \\
+        --users 100000 --follows 50
+    python -m benchmarks.scale --db /tmp/bench.sqlite3 --output new.json \\
+        --baseline old.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.utils import BASE_DIR, percentile, print_table, write_results
+
+FEEDS = ('index', 'group_list', 'profile', 'follow_index')
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def feed_querysets(hot, follower):
+    '''Ленты в порядке вьюх, чтобы найти курсор нужной страницы.'''
+    from posts.models import Post
+    from posts.timeline import timeline_posts
+
+    return {
+        'index': Post.objects.all(),
+        'group_list': Post.objects.filter(group__slug=hot['group']),
+        'profile': Post.objects.filter(author__username=hot['author']),
+        'follow_index': timeline_posts(follower),
+    }
+
+
+def page_url(base, queryset, depth, pagination):
+    '''Адрес страницы depth или None, если лента короче.'''
+    from django.conf import settings
+
+    from posts.utils import CursorPaginator
+
+    if depth == 1:
+        return base
+    # Последний пост предыдущей страницы — курсор для следующей.
+    offset = (depth - 1) * settings.POSTS_0N_PAGE - 1
+    rows = list(queryset.values('pub_date', 'id')[offset:offset + 2])
+    if len(rows) < 2:
+        return None
+    if pagination == 'offset':
+        return f'{base}?page={depth}'
+    return f'{base}?after={CursorPaginator.encode_cursor(rows[0])}'
+
+
+def cases(hot, follower, depths, pagination):
+    from django.urls import reverse
+
+    querysets = feed_querysets(hot, follower)
+    bases = {
+        'index': reverse('posts:index'),
+        'group_list': reverse('posts:group_list', args=[hot['group']]),
+        'profile': reverse('posts:profile', args=[hot['author']]),
+        'follow_index': reverse('posts:follow_index'),
+    }
+    for name in FEEDS:
+        for depth in depths:
+            url = page_url(bases[name], querysets[name], depth, pagination)
+            if url is not None:
+                yield name, depth, url
+    yield 'post_detail', 1, reverse('posts:post_detail', args=[hot['post']])
+
+
+def measure(client, url, requests):
+    from django.db import connection
+
+    # CaptureQueriesContext не подходит: request_started сбрасывает
+    # журнал запросов соединения.
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    response = client.get(url)
+    assert response.status_code == 200, (url, response.status_code)
+    with connection.execute_wrapper(count):
+        client.get(url)
+    tracemalloc.start()
+    client.get(url)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get(url)
+        latencies.append(time.perf_counter() - started)
+    return {
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'queries': len(queries),
+        'peak_kb': round(peak / 1024),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as baseline_file:
+        baseline = {
+            (row['view'], row['depth']): row
+            for row in json.load(baseline_file)['results']
+        }
+    for row in results:
+        old = baseline.get((row['view'], row['depth']))
+        row['p50_vs_base'] = (
+            f"{row['p50_ms'] / old['p50_ms']:.2f}x"
+            if old and old['p50_ms'] else '-'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db', help='готовая база от benchmarks.data')
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--follows', type=int, default=20)
+    parser.add_argument('--comments', type=int, default=10000)
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--depths', type=int, nargs='+',
+                        default=[1, 10, 100])
+    parser.add_argument('--requests', type=int, default=30)
+    parser.add_argument('--pagination', choices=('offset', 'cursor'),
+                        default='offset')
+    parser.add_argument('--cache', action='store_true',
+                        help='оставить кэш включённым')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    parser.add_argument('--baseline', help='результаты для сравнения')
+    args = parser.parse_args()
+    directory = None
+    if args.db:
+        os.environ['BENCHMARK_DB'] = os.path.abspath(args.db)
+    else:
+        directory = tempfile.mkdtemp()
+        os.environ['BENCHMARK_DB'] = os.path.join(directory, 'db.sqlite3')
+    os.environ['BENCHMARK_PAGINATION'] = args.pagination
+    if not args.cache:
+        os.environ['BENCHMARK_NO_CACHE'] = '1'
+    from benchmarks import data
+    from benchmarks.utils import setup_django
+
+    setup_django('benchmarks.settings')
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    try:
+        if directory:
+            hot = data.generate(
+                args.posts, args.users, follows=args.follows,
+                comments=args.comments, skew=args.skew,
+            )
+        else:
+            hot = data.hottest()
+        follower = get_user_model().objects.get(username=hot['follower'])
+        client = Client()
+        client.force_login(follower)
+        results = [
+            {'view': name, 'depth': depth,
+             **measure(client, url, args.requests)}
+            for name, depth, url in cases(
+                hot, follower, args.depths, args.pagination
+            )
+        ]
+    finally:
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+    if args.baseline:
+        compare(results, args.baseline)
+    print_table(results, list(results[0]))
+    write_results(args.output, {
+        'commit': commit(),
+        'pagination': args.pagination,
+        'cache': args.cache,
+        'hot': hot,
+        'results': results,
+    })
+
+
+if __name__ == '__main__':
+    main()
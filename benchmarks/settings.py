@@ -0,0 +1,53 @@
+"""Настройки проекта для бенчмарков с отдельной базой.
+
+База берётся из BENCHMARK_DB. BENCHMARK_SLOW_MS добавляет каждому
+запросу задержку, имитируя медленный вызов БД или картинок.
+BENCHMARK_NO_CACHE=1 отключает кэш, чтобы измерять сами вьюхи,
+BENCHMARK_PAGINATION переключает все ленты на offset или cursor.
+BENCHMARK_SQLITE=production включает прагмы и постоянные соединения
+из yatube.settings_production, BENCHMARK_APPS=production — его же
+приложения без отладочных, кэш шаблонов и прогрев при загрузке wsgi.
+"""
+import os
+
+from yatube.settings import *  # noqa: F401,F403
+from yatube.settings import MIDDLEWARE, PAGINATION_MODES
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['BENCHMARK_DB'],
+    }
+}
+
+if os.environ.get('BENCHMARK_APPS') == 'production':
+    from yatube.settings_production import (  # noqa: F401
+        INSTALLED_APPS, MIDDLEWARE, TEMPLATES, WARM_UP,
+    )
+
+if os.environ.get('BENCHMARK_SLOW_MS'):
+    MIDDLEWARE = ['benchmarks.middleware.SlowCallMiddleware', *MIDDLEWARE]
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+
+if os.environ.get('BENCHMARK_NO_CACHE'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    }
+
+if os.environ.get('BENCHMARK_PAGINATION'):
+    PAGINATION_MODES = dict.fromkeys(
+        PAGINATION_MODES, os.environ['BENCHMARK_PAGINATION']
+    )
+
+if os.environ.get('BENCHMARK_SQLITE') == 'production':
+    from yatube.settings_production import SQLITE_PRAGMAS  # noqa: F401
+    DATABASES['default'].update(
+        ENGINE='core.backends.sqlite3',
+        CONN_MAX_AGE=60,
+    )
@@ -0,0 +1,162 @@
+"""Чтение под одновременной записью комментариев в SQLite.
+
+Поднимает gunicorn с несколькими процессами и потоками на копии
+одной и той же базы с постами и для каждого профиля SQLite держит
+--readers клиентов, читающих ленты и страницы постов, и --writers
+клиентов, отправляющих комментарии. Профиль default — настройки
+разработки (журнал отката, новое соединение на запрос), production —
+прагмы и CONN_MAX_AGE из yatube.settings_production. Кэш отключён,
+чтобы каждое чтение доходило до базы.
+
+    python -m benchmarks.sqlite_profile --readers 50 --writers 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from benchmarks.concurrency import fetch, free_port, populate, wait_for_port
+from benchmarks.utils import (BASE_DIR, PROJECT_DIR, percentile, print_table,
+                              setup_django, write_results)
+
+PROFILES = ('default', 'production')
+
+
+def writer_session():
+    '''Cookie сессии и CSRF для отправки комментариев без браузера.'''
+    from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                     SESSION_KEY, get_user_model)
+    from django.contrib.sessions.backends.db import SessionStore
+    from django.middleware.csrf import _get_new_csrf_token
+
+    user = get_user_model().objects.create_user(username='commenter')
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    token = _get_new_csrf_token()
+    return session.session_key, token
+
+
+async def load(port, paths, post_ids, session, args):
+    stats = {
+        kind: {'latencies': [], 'errors': 0} for kind in ('read', 'write')
+    }
+    session_key, token = session
+    headers = (f'Cookie: sessionid={session_key}; csrftoken={token}',)
+    deadline = time.monotonic() + args.duration
+
+    async def client(kind):
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                if kind == 'read':
+                    status = await fetch(port, random.choice(paths))
+                else:
+                    body = urlencode({
+                        'text': 'Комментарий под нагрузкой',
+                        'csrfmiddlewaretoken': token,
+                    }).encode()
+                    status = await fetch(
+                        port, f'/posts/{random.choice(post_ids)}/comment/',
+                        'POST', body, headers,
+                    )
+            except (OSError, IndexError, ValueError):
+                status = None
+            if status != {'read': 200, 'write': 302}[kind]:
+                stats[kind]['errors'] += 1
+                continue
+            stats[kind]['latencies'].append(time.monotonic() - started)
+
+    started = time.monotonic()
+    await asyncio.gather(
+        *(client('read') for _ in range(args.readers)),
+        *(client('write') for _ in range(args.writers)),
+    )
+    return stats, time.monotonic() - started
+
+
+def run(profile, database, paths, post_ids, session, args):
+    port = free_port()
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'benchmarks.settings',
+        'BENCHMARK_DB': database,
+        'BENCHMARK_NO_CACHE': '1',
+        'BENCHMARK_SQLITE': profile,
+        'PYTHONPATH': os.pathsep.join((BASE_DIR, PROJECT_DIR)),
+    }
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn',
+            '--workers', str(args.workers), '--threads', str(args.threads),
+            '--bind', f'127.0.0.1:{port}', 'yatube.wsgi:application',
+        ],
+        cwd=PROJECT_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        stats, elapsed = asyncio.run(
+            load(port, paths, post_ids, session, args)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+    row = {'profile': profile}
+    for kind, data in stats.items():
+        row[f'{kind}s_per_sec'] = round(len(data['latencies']) / elapsed, 1)
+        row[f'{kind}_p99_ms'] = round(
+            percentile(data['latencies'], 99) * 1000, 1
+        )
+        row[f'{kind}_errors'] = data['errors']
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=50)
+    parser.add_argument('--writers', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES))
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    source = os.path.join(directory, 'source.sqlite3')
+    os.environ['BENCHMARK_DB'] = source
+    setup_django('benchmarks.settings')
+    from django.db import connection
+
+    try:
+        paths = populate(args.posts, users=20)
+        session = writer_session()
+        from posts.models import Post
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:20])
+        connection.close()
+        results = []
+        for profile in args.profiles:
+            # Режим журнала хранится в файле, поэтому у каждого
+            # профиля своя копия исходной базы.
+            database = os.path.join(directory, f'{profile}.sqlite3')
+            shutil.copy(source, database)
+            results.append(
+                run(profile, database, paths, post_ids, session, args)
+            )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print_table(results, list(results[0]))
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
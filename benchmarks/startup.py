@@ -0,0 +1,163 @@
+"""Время старта и память воркеров gunicorn при разных настройках.
+
+Режимы: dev — приложения из yatube.settings вместе с панелью отладки,
+без прогрева; production — приложения, кэш шаблонов и прогрев из
+yatube.settings_production; preload — то же с `gunicorn --preload`,
+когда прогрев выполняется один раз в мастере до fork воркеров.
+
+Для каждого режима печатаются время импорта yatube.wsgi в отдельном
+процессе, его RSS и число модулей, затем время от запуска gunicorn
+до первого ответа и суммарные RSS и PSS мастера и воркеров после
+того, как каждый воркер обработал запросы. В PSS общая страница
+памяти делится между процессами, которые её используют, поэтому
+он показывает выигрыш от копирования при записи, а RSS — нет.
+
+    python -m benchmarks.startup --workers 4
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.concurrency import fetch, free_port, populate
+from benchmarks.utils import (BASE_DIR, PROJECT_DIR, print_table,
+                              setup_django, write_results)
+
+MODES = {
+    'dev': ({}, []),
+    'production': ({'BENCHMARK_APPS': 'production'}, []),
+    'preload': ({'BENCHMARK_APPS': 'production'}, ['--preload']),
+}
+IMPORT_PROBE = '''
+import sys, time
+started = time.perf_counter()
+import yatube.wsgi
+elapsed = time.perf_counter() - started
+with open('/proc/self/status') as status:
+    rss = next(line for line in status if line.startswith('VmRSS'))
+print(elapsed, rss.split()[1], len(sys.modules))
+'''
+
+
+def memory_kb(pid):
+    '''RSS и PSS процесса в килобайтах из /proc/<pid>/smaps_rollup.'''
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                values[name] = int(rest.split()[0])
+    return values['Rss'], values['Pss']
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as file:
+        return [int(child) for child in file.read().split()]
+
+
+def probe_import(env):
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_PROBE], cwd=PROJECT_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return {
+        'import_ms': round(float(output[0]) * 1000),
+        'import_rss_mb': round(int(output[1]) / 1024, 1),
+        'modules': int(output[2]),
+    }
+
+
+async def first_response(port, path, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if await fetch(port, path) == 200:
+                return
+        except (OSError, IndexError, ValueError):
+            pass
+        await asyncio.sleep(0.02)
+    raise RuntimeError(f'Сервер не ответил на порту {port}')
+
+
+async def touch_workers(port, paths, requests):
+    # Одновременные запросы расходятся по всем воркерам.
+    await asyncio.gather(*(
+        fetch(port, paths[number % len(paths)])
+        for number in range(requests)
+    ))
+
+
+def run_server(env, flags, paths, args):
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn', *flags,
+            '--workers', str(args.workers),
+            '--bind', f'127.0.0.1:{port}', 'yatube.wsgi:application',
+        ],
+        cwd=PROJECT_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(first_response(port, paths[0]))
+        ready = time.perf_counter() - started
+        for _ in range(args.rounds):
+            asyncio.run(touch_workers(port, paths, args.workers * 4))
+        pids = [server.pid, *children(server.pid)]
+        memory = [memory_kb(pid) for pid in pids]
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        'ready_s': round(ready, 2),
+        'rss_mb': round(sum(rss for rss, _ in memory) / 1024, 1),
+        'pss_mb': round(sum(pss for _, pss in memory) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=10,
+                        help='пачек запросов до замера памяти')
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--modes', nargs='+', default=list(MODES))
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    database = os.path.join(directory, 'db.sqlite3')
+    os.environ['BENCHMARK_DB'] = database
+    setup_django('benchmarks.settings')
+    from django.db import connection
+
+    try:
+        paths = populate(args.posts, users=20)
+        connection.close()
+        results = []
+        for mode in args.modes:
+            extra_env, flags = MODES[mode]
+            env = {
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': 'benchmarks.settings',
+                'BENCHMARK_DB': database,
+                'PYTHONPATH': os.pathsep.join((BASE_DIR, PROJECT_DIR)),
+                **extra_env,
+            }
+            results.append({
+                'mode': mode,
+                **probe_import(env),
+                **run_server(env, flags, paths, args),
+            })
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print_table(results, list(results[0]))
+    write_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
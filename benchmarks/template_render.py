@@ -0,0 +1,144 @@
+"""Время отрисовки шаблонов с кэширующим загрузчиком и без него.
+
+Страницы постов запрашиваются тестовым клиентом Django при трёх
+настройках загрузчиков: uncached — filesystem и app_directories, как
+при DEBUG, когда каждый extends и include заново ищет и разбирает
+файл; cached — кэширующий загрузчик из settings_production без
+прогрева; warmed — он же после warm_templates(). Для каждой страницы
+печатаются время первого запроса, p50/p95 запроса и p50 времени
+внутри отрисовки шаблонов. Кэш фрагментов отключён.
+
+    python -m benchmarks.template_render --requests 200
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.utils import percentile, print_table, write_results
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+MODES = {
+    'uncached': LOADERS,
+    'cached': [('django.template.loaders.cached.Loader', LOADERS)],
+    'warmed': [('django.template.loaders.cached.Loader', LOADERS)],
+}
+
+
+class RenderTimer:
+    '''Суммирует время внешних вызовов отрисовки шаблона.'''
+
+    def __init__(self):
+        self.depth = 0
+        self.seconds = 0.0
+
+    def wrap(self, render):
+        def timed(*args, **kwargs):
+            self.depth += 1
+            started = time.perf_counter()
+            try:
+                return render(*args, **kwargs)
+            finally:
+                self.depth -= 1
+                if not self.depth:
+                    self.seconds += time.perf_counter() - started
+        return timed
+
+
+def templates(loaders):
+    from django.conf import settings
+
+    return [{
+        **settings.TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {**settings.TEMPLATES[0]['OPTIONS'], 'loaders': loaders},
+    }]
+
+
+def timed_get(client, timer, url):
+    timer.seconds = 0.0
+    started = time.perf_counter()
+    response = client.get(url)
+    assert response.status_code == 200, (url, response.status_code)
+    return time.perf_counter() - started, timer.seconds
+
+
+def measure(mode, client, timer, urls, requests):
+    from django.test import override_settings
+
+    from core.warmup import warm_templates
+
+    with override_settings(TEMPLATES=templates(MODES[mode])):
+        if mode == 'warmed':
+            warm_templates()
+        rows = []
+        for name, url in urls.items():
+            first, _ = timed_get(client, timer, url)
+            samples = [
+                timed_get(client, timer, url) for _ in range(requests)
+            ]
+            rows.append({
+                'mode': mode,
+                'page': name,
+                'first_ms': round(first * 1000, 2),
+                'p50_ms': round(percentile(
+                    [total for total, _ in samples], 50) * 1000, 2),
+                'p95_ms': round(percentile(
+                    [total for total, _ in samples], 95) * 1000, 2),
+                'render_p50_ms': round(percentile(
+                    [render for _, render in samples], 50) * 1000, 2),
+            })
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--comments', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    os.environ['BENCHMARK_DB'] = os.path.join(directory, 'db.sqlite3')
+    os.environ['BENCHMARK_NO_CACHE'] = '1'
+    from benchmarks import data
+    from benchmarks.utils import setup_django
+
+    setup_django('benchmarks.settings')
+    from django.contrib.auth import get_user_model
+    from django.template.backends import django as backend
+    from django.test import Client
+    from django.urls import reverse
+
+    timer = RenderTimer()
+    backend.Template.render = timer.wrap(backend.Template.render)
+    try:
+        hot = data.generate(args.posts, args.users, comments=args.comments)
+        client = Client()
+        client.force_login(
+            get_user_model().objects.get(username=hot['follower'])
+        )
+        urls = {
+            'index': reverse('posts:index'),
+            'group_list': reverse('posts:group_list', args=[hot['group']]),
+            'profile': reverse('posts:profile', args=[hot['author']]),
+            'post_detail': reverse('posts:post_detail', args=[hot['post']]),
+        }
+        results = [
+            row
+            for mode in MODES
+            for row in measure(mode, client, timer, urls, args.requests)
+        ]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print_table(results, list(results[0]))
+    write_results(args.output, {'results': results})
+
+
+if __name__ == '__main__':
+    main()
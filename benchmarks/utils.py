@@ -0,0 +1,49 @@
+"""Общие помощники бенчмарков.
+
+Бенчмарки запускаются из корня репозитория как модули:
+
+    python -m benchmarks.cache_backends
+"""
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(BASE_DIR, 'yatube')
+
+
+def setup_django(settings_module='yatube.settings'):
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def print_table(rows, columns):
+    widths = [
+        max(len(str(column)), *(len(str(row[column])) for row in rows))
+        for column in columns
+    ]
+    print('  '.join(
+        str(column).ljust(width) for column, width in zip(columns, widths)
+    ))
+    for row in rows:
+        print('  '.join(
+            str(row[column]).ljust(width)
+            for column, width in zip(columns, widths)
+        ))
+
+
+def write_results(path, results):
+    if path:
+        with open(path, 'w') as output:
+            json.dump(results, output, ensure_ascii=False, indent=2)
@@ -0,0 +1,48 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from core.queries import QueryRecorder
+
+# Наибольшее число SQL-запросов на страницу при холодном кэше
+# для авторизованного пользователя (сессия и пользователь входят).
+# Бюджет не зависит от числа постов и комментариев на странице:
+# всё связанное должно читаться select_related, а не в цикле.
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 5,
+    'posts:profile': 8,
+    'posts:post_detail': 5,
+    'posts:post_comments': 5,
+    'posts:follow_index': 5,
+    'posts:search': 4,
+    'api:index': 3,
+    'api:group': 4,
+    'api:profile': 6,
+    'api:follow': 5,
+    'api:post': 4,
+    'api:comments': 4,
+}
+
+
+@pytest.fixture
+def query_budget():
+    '''Запрашивает страницу и сверяет число запросов с QUERY_BUDGETS.
+
+    При превышении выводит все запросы и повторы по местам вызова.
+    Возвращает ответ и записанные запросы.
+    '''
+    def check(client, url_name, *args, data=None):
+        cache.clear()
+        with QueryRecorder() as recorder:
+            response = client.get(reverse(url_name, args=args), data)
+        assert response.status_code == 200, (
+            f'Страница `{url_name}` вернула {response.status_code}'
+        )
+        budget = QUERY_BUDGETS[url_name]
+        assert len(recorder) <= budget, (
+            f'Страница `{url_name}` делает больше {budget} запросов.\n'
+            f'{recorder.report()}'
+        )
+        return response, recorder
+    return check
@@ -0,0 +1,79 @@
+import pytest
+
+from posts.models import Comment, Follow, Group, Post
+
+from tests.fixtures.fixture_queries import QUERY_BUDGETS
+
+pytestmark = [pytest.mark.django_db]
+
+
+def make_data(django_user_model, user, size):
+    '''Посты разных авторов и групп с комментариями разных людей.'''
+    group = Group.objects.create(title='Группа', slug='budget')
+    post = None
+    for number in range(size):
+        author = django_user_model.objects.create_user(f'author{number}')
+        Follow.objects.create(user=user, author=author)
+        other_group = Group.objects.create(
+            title=f'Группа {number}', slug=f'group{number}'
+        )
+        post = Post.objects.create(
+            text=f'Пост про бюджет {number}',
+            author=author,
+            group=other_group if number % 2 else group,
+        )
+    for number in range(size):
+        Comment.objects.create(post=post, author=user, text=f'Ответ {number}')
+    return group, post
+
+
+def cases(user, group, post):
+    return {
+        'posts:index': (),
+        'posts:group_list': (group.slug,),
+        'posts:profile': (post.author.username,),
+        'posts:post_detail': (post.pk,),
+        'posts:post_comments': (post.pk,),
+        'posts:follow_index': (),
+        'posts:search': (),
+        'api:index': (),
+        'api:group': (group.slug,),
+        'api:profile': (post.author.username,),
+        'api:follow': (),
+        'api:post': (post.pk,),
+        'api:comments': (post.pk,),
+    }
+
+
+class TestQueryBudget:
+
+    def test_budget_table_covers_cases(self, user):
+        post = Post(pk=1, author=user)
+        assert set(cases(user, Group(slug='slug'), post)) == set(
+            QUERY_BUDGETS
+        ), 'Для каждой страницы из QUERY_BUDGETS нужен тестовый запрос'
+
+    @pytest.mark.parametrize('size', [1, 25])
+    def test_pages_stay_within_budget(self, user_client, user,
+                                      django_user_model, query_budget, size):
+        group, post = make_data(django_user_model, user, size)
+        for url_name, args in cases(user, group, post).items():
+            query_budget(user_client, url_name, *args, data={'q': 'бюджет'})
+
+    def test_queries_do_not_grow_with_page(self, user_client, user,
+                                           django_user_model, query_budget):
+        counts = []
+        for size in (1, 25):
+            group, post = make_data(django_user_model, user, size)
+            counts.append({
+                url_name: len(query_budget(
+                    user_client, url_name, *args, data={'q': 'бюджет'}
+                )[1])
+                for url_name, args in cases(user, group, post).items()
+            })
+            Post.objects.all().delete()
+            Group.objects.all().delete()
+            django_user_model.objects.exclude(pk=user.pk).delete()
+        assert counts[0] == counts[1], (
+            'Число запросов страниц растёт вместе с числом постов'
+        )
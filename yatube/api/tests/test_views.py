@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class ApiViewsTests(TestCase):
+    POST_COUNT = 13
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Bilbo')
+        cls.user = User.objects.create_user(username='Frodo')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for number in range(cls.POST_COUNT):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text=f'Тестовый текст {number}',
+                group=cls.group,
+            )
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='Тестовый комментарий',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def read_feed(self, client, url):
+        first = client.get(url).json()
+        second = client.get(url, {'after': first['next_cursor']}).json()
+        self.assertIsNone(second['next_cursor'])
+        return first['results'] + second['results']
+
+    def test_feeds_paginated_by_cursor(self):
+        '''Ленты API отдают все посты по курсорам от новых к старым'''
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+        urls = (
+            reverse('api:index'),
+            reverse('api:group', args=[self.group.slug]),
+            reverse('api:profile', args=[self.author.username]),
+            reverse('api:follow'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                results = self.read_feed(self.authorized_client, url)
+                self.assertEqual([post['id'] for post in results], expected)
+        self.assertEqual(results[0]['author'], self.author.username)
+        self.assertEqual(results[0]['group'], self.group.slug)
+
+    def test_feed_is_one_query(self):
+        '''Страница ленты для гостя читается одним запросом'''
+        with self.assertNumQueries(1):
+            self.guest_client.get(reverse('api:index'))
+
+    def test_post_and_comments(self):
+        '''Пост и его комментарии отдаются в JSON'''
+        post = self.guest_client.get(
+            reverse('api:post', args=[self.post.pk])
+        ).json()
+        self.assertEqual(post['text'], self.post.text)
+        self.assertEqual(post['comments_count'], 1)
+        comments = self.guest_client.get(
+            reverse('api:comments', args=[self.post.pk])
+        ).json()
+        self.assertEqual(
+            [comment['text'] for comment in comments['results']],
+            ['Тестовый комментарий'],
+        )
+
+    def test_errors(self):
+        '''Ошибки API отдаются в JSON с нужным статусом'''
+        cases = (
+            (reverse('api:follow'), 401),
+            (reverse('api:post', args=[0]), 404),
+            (reverse('api:comments', args=[0]), 404),
+            (reverse('api:group', args=['missing']), 404),
+            (reverse('api:profile', args=['missing']), 404),
+        )
+        for url, status in cases:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+
+    def test_conditional_get(self):
+        '''Неизменившиеся ответы API отдаются ответом 304'''
+        url = reverse('api:follow')
+        etag = self.authorized_client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Follow.objects.filter(user=self.user).delete()
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_comment_changes_feed_etag(self):
+        '''Новый комментарий меняет ETag лент с comments_count'''
+        urls = (
+            reverse('api:index'),
+            reverse('api:group', args=[self.group.slug]),
+            reverse('api:profile', args=[self.author.username]),
+            reverse('api:follow'),
+        )
+        etags = {url: self.authorized_client.get(url)['ETag'] for url in urls}
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Новый комментарий'
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.json()['results'][0]['comments_count'], 2
+                )
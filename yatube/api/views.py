@@ -0,0 +1,135 @@
+"""Версионированное JSON API для лент, постов и комментариев.
+
+Вьюхи берут те же выборки, что и HTML-ленты, но читают их через
+values(): без создания моделей и рендеринга шаблонов. Ленты
+и комментарии отдаются по курсорам (?after=/?before=), а ответы
+проверяются теми же валидаторами условных GET, что и страницы.
+"""
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+
+from posts.conditional import (conditional_page, feed_etag, follow_etag,
+                               post_etag, post_updated, profile_etag,
+                               with_comments)
+from posts.models import Comment, Group, Post, User
+from posts.timeline import timeline_posts
+from posts.utils import CursorPaginator, comments_page
+
+POST_FIELDS = (
+    'id',
+    'text',
+    'pub_date',
+    'author__username',
+    'group__slug',
+    'image',
+    'comments_count',
+)
+COMMENT_FIELDS = (
+    'id',
+    'text',
+    'created',
+    'author__username',
+)
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def not_found(detail):
+    return json_response({'detail': detail}, status=404)
+
+
+def serialize_post(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': default_storage.url(row['image']) if row['image'] else None,
+        'comments_count': row['comments_count'],
+    }
+
+
+def serialize_comment(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'],
+        'author': row['author__username'],
+    }
+
+
+def feed_response(request, post_list):
+    page = CursorPaginator(
+        post_list.values(*POST_FIELDS),
+        settings.POSTS_0N_PAGE,
+    ).get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return json_response({
+        'results': [serialize_post(row) for row in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+@conditional_page(with_comments(feed_etag))
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@conditional_page(with_comments(feed_etag))
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return not_found('Группа не найдена.')
+    return feed_response(request, group.posts.all())
+
+
+@conditional_page(with_comments(profile_etag))
+def profile(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return not_found('Пользователь не найден.')
+    return feed_response(request, author.posts.all())
+
+
+@conditional_page(with_comments(follow_etag))
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return json_response(
+            {'detail': 'Требуется авторизация.'}, status=401
+        )
+    return feed_response(request, timeline_posts(request.user))
+
+
+@conditional_page(post_etag)
+def post_detail(request, post_id):
+    row = Post.objects.filter(pk=post_id).values(*POST_FIELDS).first()
+    if row is None:
+        return not_found('Пост не найден.')
+    return json_response(serialize_post(row))
+
+
+@conditional_page(post_etag)
+def post_comments(request, post_id):
+    if post_updated(request, post_id) is None:
+        return not_found('Пост не найден.')
+    page = comments_page(
+        Comment.objects.filter(post_id=post_id).values(*COMMENT_FIELDS),
+        after=request.GET.get('after'),
+    )
+    return json_response({
+        'results': [serialize_comment(row) for row in page],
+        'next_cursor': page.next_cursor,
+    })
@@ -0,0 +1,16 @@
+"""SQLite, в котором транзакции atomic() сразу берут блокировку записи.
+
+Django начинает транзакцию обычным BEGIN: блокировка записи берётся
+только на первом INSERT или UPDATE. Если к этому времени базу
+изменил другой процесс, SQLite не может поднять блокировку чтения
+до записи и сразу отвечает «database is locked», не дожидаясь
+busy_timeout. С BEGIN IMMEDIATE писатели ждут друг друга в очереди
+на входе в транзакцию, а читатели в WAL им не мешают.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
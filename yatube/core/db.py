@@ -0,0 +1,71 @@
+"""Настройка соединений с базой и счётчики запросов по алиасам.
+
+Django открывает соединение сам, поэтому прагмы из
+settings.SQLITE_PRAGMAS выполняются по сигналу connection_created.
+Часть из них (journal_mode) хранится в файле базы, остальные
+действуют только на соединение и должны ставиться каждый раз.
+
+По тому же сигналу на соединение ставится обёртка, которая считает
+запросы и их время для каждого алиаса базы. Счётчики общие для всех
+потоков процесса; их показывает db_metrics.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_metrics = defaultdict(lambda: {'queries': 0, 'seconds': 0.0})
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class QueryCounter:
+    """Обёртка выполнения запросов, считающая их для одного алиаса."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with _lock:
+                metrics = _metrics[self.alias]
+                metrics['queries'] += 1
+                metrics['seconds'] += elapsed
+
+
+def count_queries(sender, connection, **kwargs):
+    # Сигнал приходит при каждом переподключении, а список обёрток
+    # живёт в объекте соединения: вторая обёртка не нужна. Обёртка
+    # ставится в начало списка: execute_wrapper() снимает последнюю,
+    # а соединение может открыться внутри такого блока.
+    if not any(
+        isinstance(wrapper, QueryCounter)
+        for wrapper in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.insert(
+            0, QueryCounter(connection.alias)
+        )
+
+
+def query_metrics():
+    '''Число запросов и их суммарное время по алиасам баз.'''
+    with _lock:
+        return {
+            alias: {
+                'queries': metrics['queries'],
+                'seconds': round(metrics['seconds'], 6),
+            }
+            for alias, metrics in _metrics.items()
+        }
@@ -0,0 +1,68 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from core.routers import replicas_synced
+
+
+def backup(source, target):
+    '''Копирует базу source в target через backup API SQLite.
+
+    Копия пишется одной транзакцией в самой реплике: её читатели
+    в WAL видят старые данные до конца копирования, а не пустой или
+    наполовину записанный файл.
+    '''
+    replica = sqlite3.connect(target)
+    try:
+        replica.execute('PRAGMA journal_mode = WAL')
+        source.backup(replica)
+    finally:
+        replica.close()
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в реплики для чтения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Повторять каждые столько секунд; без него — один раз',
+        )
+
+    def handle(self, *args, **options):
+        replicas = {
+            alias: settings.DATABASES[alias]['NAME']
+            for alias in settings.DATABASE_REPLICAS
+        }
+        if not replicas:
+            raise CommandError('В DATABASE_REPLICAS нет реплик')
+        primary = sqlite3.connect(
+            settings.DATABASES[DEFAULT_DB_ALIAS]['NAME']
+        )
+        synced_version = None
+        try:
+            while True:
+                # data_version меняется, когда базу изменило другое
+                # соединение: без изменений копировать нечего.
+                version = primary.execute('PRAGMA data_version').fetchone()
+                if version != synced_version:
+                    self.sync(primary, replicas)
+                    synced_version = version
+                if not options['interval']:
+                    return
+                time.sleep(options['interval'])
+        finally:
+            primary.close()
+
+    def sync(self, primary, replicas):
+        for alias, target in replicas.items():
+            started = time.perf_counter()
+            backup(primary, target)
+            self.stdout.write(
+                f'{alias}: {time.perf_counter() - started:.2f} с'
+            )
+        replicas_synced.send(sender=self.__class__)
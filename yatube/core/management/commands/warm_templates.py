@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import TemplateSyntaxError
+
+from core.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Компилирует все шаблоны проекта: при деплое находит ошибки '
+        'в шаблонах до того, как их увидят пользователи'
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            warmed = warm_templates()
+        except TemplateSyntaxError as error:
+            raise CommandError(f'Ошибка в шаблоне: {error}')
+        self.stdout.write(
+            f'Шаблонов: {len(warmed)}, '
+            f'{time.perf_counter() - started:.2f} с'
+        )
@@ -0,0 +1,92 @@
+"""Запись SQL-запросов для проверок бюджета запросов в тестах.
+
+QueryRecorder ставит обёртку на выполнение запросов соединения
+и для каждого запроса запоминает место вызова: строку шаблона, если
+запрос сделан при рендеринге, иначе ближайшую строку кода проекта.
+Запросы, повторившиеся с точностью до параметров, группируются по
+месту вызова — так N+1 виден сразу, без чтения всего журнала.
+"""
+import os
+import re
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+PROJECT_DIR = settings.BASE_DIR + os.sep
+PARAMS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def normalize(sql):
+    '''Текст запроса без значений параметров.'''
+    return PARAMS.sub('?', sql)
+
+
+def call_site(frame):
+    '''Строка шаблона или кода проекта, откуда выполнен запрос.'''
+    project_line = None
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                return f'{origin.template_name}:{token.lineno}'
+        if (
+            project_line is None
+            and code.co_filename.startswith(PROJECT_DIR)
+            and code.co_filename != __file__
+            and 'site-packages' not in code.co_filename
+        ):
+            project_line = (
+                f'{os.path.relpath(code.co_filename, PROJECT_DIR)}:'
+                f'{frame.f_lineno}'
+            )
+        frame = frame.f_back
+    return project_line or '?'
+
+
+class QueryRecorder:
+    """Контекстный менеджер, собирающий (sql, место вызова)."""
+
+    def __init__(self, using=connection):
+        self.connection = using
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, call_site(sys._getframe(1))))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.wrapper = self.connection.execute_wrapper(self)
+        self.wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.wrapper.__exit__(*exc_info)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def duplicates(self):
+        '''Повторы: (место вызова, запрос без параметров) → число.'''
+        counts = Counter(
+            (site, normalize(sql)) for sql, site in self.queries
+        )
+        return {key: count for key, count in counts.items() if count > 1}
+
+    def report(self):
+        lines = [f'{len(self)} запросов:']
+        lines += [f'  {site}: {sql}' for sql, site in self.queries]
+        duplicates = self.duplicates()
+        if duplicates:
+            lines.append('Повторяющиеся запросы по местам вызова:')
+            lines += [
+                f'  {count} × {site}: {sql}'
+                for (site, sql), count in sorted(
+                    duplicates.items(), key=lambda item: -item[1]
+                )
+            ]
+        return '\n'.join(lines)
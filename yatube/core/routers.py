@@ -0,0 +1,98 @@
+"""Чтение с реплик SQLite и запись в основную базу.
+
+Реплики перечислены в settings.DATABASE_REPLICAS и обновляются
+командой sync_replicas, поэтому отстают от основной базы на период
+синхронизации. Чтобы пользователь сразу видел свои изменения, запрос
+с записью в базу ставит cookie, по которой чтения этого браузера ещё
+REPLICA_PIN_SECONDS секунд идут в основную базу. Запись замечает сам
+роутер, поэтому это работает и для GET, который пишет (подписка
+по ссылке). POST и другие небезопасные методы читают из основной
+базы с самого начала, остальные — с первой записи.
+
+Вне запросов (команды, воркеры, shell) всё читается из основной
+базы: они часто пишут по результатам чтения.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.dispatch import Signal
+
+PIN_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+routing = ContextVar('routing', default=None)
+
+# Реплики получили новые данные: кэш, собранный по старым, устарел.
+replicas_synced = Signal()
+
+
+class RequestRouting:
+    """Состояние запроса: можно ли читать с реплики и была ли запись."""
+
+    def __init__(self, replica_reads):
+        self.replica_reads = replica_reads
+        self.wrote = False
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = routing.get()
+        if (
+            state is None or not state.replica_reads
+            or not settings.DATABASE_REPLICAS
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = routing.get()
+        if state is not None:
+            # После записи и этот запрос читает свои изменения.
+            state.wrote = True
+            state.replica_reads = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия основной базы, объекты из них связываются.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def pinned_until(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0))
+    except ValueError:
+        return 0
+
+
+class ReplicaPinningMiddleware:
+    """Разрешает чтение с реплик запросам без записи и без cookie."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RequestRouting(
+            request.method in SAFE_METHODS
+            and pinned_until(request) < time.time()
+        )
+        token = routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing.reset(token)
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
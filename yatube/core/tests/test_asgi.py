@@ -0,0 +1,79 @@
+import gc
+import warnings
+
+import h11
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.test import SimpleTestCase
+
+from yatube.asgi import application
+
+
+class AsgiApplicationTest(SimpleTestCase):
+
+    @async_to_sync
+    async def request(self, path):
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http',
+            'http_version': '1.1',
+            'method': 'GET',
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80),
+        })
+        await communicator.send_input({
+            'type': 'http.request', 'body': b'', 'more_body': False,
+        })
+        start = await communicator.receive_output()
+        body = b''
+        while True:
+            message = await communicator.receive_output()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        await communicator.wait()
+        return start, body
+
+    @async_to_sync
+    async def lifespan(self):
+        communicator = ApplicationCommunicator(
+            application, {'type': 'lifespan'}
+        )
+        replies = []
+        for event in ('startup', 'shutdown'):
+            await communicator.send_input({'type': f'lifespan.{event}'})
+            replies.append((await communicator.receive_output())['type'])
+        await communicator.wait()
+        return replies
+
+    def test_view_served_from_thread_pool(self):
+        '''Вьюха отвечает через ASGI-обёртку WSGI-приложения.'''
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            start, body = self.request('/about/tech/')
+            gc.collect()
+        # Все корутины обёртки дождались.
+        self.assertFalse([
+            warning for warning in caught
+            if issubclass(warning.category, RuntimeWarning)
+        ])
+        self.assertEqual(start['type'], 'http.response.start')
+        self.assertEqual(start['status'], 200)
+        self.assertIn('Технологии'.encode(), body)
+
+    def test_cookie_headers_valid_for_h11(self):
+        '''Заголовки Set-Cookie проходят проверку h11 в uvicorn.'''
+        start, _ = self.request('/auth/login/')
+        cookies = [
+            value for name, value in start['headers'] if name == b'set-cookie'
+        ]
+        self.assertTrue(cookies)
+        for value in cookies:
+            h11.Response(status_code=200, headers=[('set-cookie', value)])
+
+    def test_lifespan_acknowledged(self):
+        '''События запуска и остановки сервера подтверждаются.'''
+        self.assertEqual(self.lifespan(), [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete',
+        ])
@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from ..cache import SQLiteCache
+
+
+def increment_many(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_get_set_delete(self):
+        """Значения сохраняются, читаются и удаляются."""
+        self.cache.set('post', {'text': 'Тестовый текст'})
+        self.assertEqual(self.cache.get('post'), {'text': 'Тестовый текст'})
+        self.assertEqual(self.cache.get_many(['post', 'missing']), {
+            'post': {'text': 'Тестовый текст'},
+        })
+        self.cache.delete('post')
+        self.assertIsNone(self.cache.get('post'))
+        self.assertEqual(self.cache.get('post', 'default'), 'default')
+
+    def test_add_and_incr(self):
+        """add не перезаписывает ключ, incr меняет только числа."""
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.cache.decr('counter'), 2)
+        self.cache.set('text', 'Тестовый текст')
+        with self.assertRaises(ValueError):
+            self.cache.incr('text')
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expired_keys(self):
+        """Просроченные ключи не читаются и освобождают место для add."""
+        self.cache.set('post', 'Тестовый текст', timeout=0.01)
+        time.sleep(0.02)
+        self.assertFalse(self.cache.has_key('post'))
+        self.assertIsNone(self.cache.get('post'))
+        self.assertTrue(self.cache.add('post', 'Новый текст'))
+        self.assertEqual(self.cache.get('post'), 'Новый текст')
+
+    def test_shared_between_instances(self):
+        """Записи видны другим экземплярам, например воркерам."""
+        SQLiteCache(self.location, {}).set('post', 'Тестовый текст')
+        self.assertEqual(self.cache.get('post'), 'Тестовый текст')
+        self.cache.clear()
+        self.assertIsNone(SQLiteCache(self.location, {}).get('post'))
+
+    def test_cull(self):
+        """При переполнении удаляются давно читавшиеся ключи."""
+        cache = SQLiteCache(
+            self.location,
+            {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}},
+        )
+        for number in range(30):
+            cache.set(f'post-{number}', number)
+        cache._cull()
+        count = cache._connection.execute(
+            'SELECT COUNT(*) FROM cache'
+        ).fetchone()[0]
+        self.assertLessEqual(count, 15)
+        self.assertTrue(cache.has_key('post-29'))
+
+    def test_incr_is_atomic_between_processes(self):
+        """incr из нескольких процессов не теряет обновлений."""
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            self.skipTest('fork недоступен')
+        self.cache.set('counter', 0)
+        workers = [
+            context.Process(target=increment_many, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
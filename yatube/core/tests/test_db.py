@@ -0,0 +1,57 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, override_settings
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 1234,
+}
+
+
+class SQLiteProfileTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+        self.connections = ConnectionHandler({
+            'default': {
+                'ENGINE': 'core.backends.sqlite3',
+                'NAME': self.path,
+            },
+        })
+        self.connection = self.connections['default']
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS=PRAGMAS)
+    def test_pragmas_applied_to_new_connections(self):
+        """Прагмы из настроек ставятся на каждом новом соединении."""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+    def test_transaction_takes_write_lock_at_begin(self):
+        """Транзакция берёт блокировку записи до первого запроса."""
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        self.connection.ensure_connection()
+        self.connection._start_transaction_under_autocommit()
+        try:
+            with self.assertRaisesMessage(
+                sqlite3.OperationalError, 'database is locked'
+            ):
+                other.execute('BEGIN IMMEDIATE')
+        finally:
+            self.connection.cursor().execute('ROLLBACK')
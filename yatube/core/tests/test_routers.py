@@ -0,0 +1,144 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.feed_cache import feed_generation
+from posts.models import Post
+
+from ..db import query_metrics
+from ..management.commands.sync_replicas import backup
+from ..routers import (PIN_COOKIE, ReplicaPinningMiddleware,
+                       replicas_synced)
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=15)
+class ReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def route(self, request, write=False):
+        '''База чтения (и записи) внутри запроса и ответ middleware.'''
+        routes = {}
+
+        def view(request):
+            routes['read'] = router.db_for_read(Post)
+            if write:
+                routes['write'] = router.db_for_write(Post)
+                routes['read_after_write'] = router.db_for_read(Post)
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(request)
+        return routes, response
+
+    def test_reads_outside_requests_use_primary(self):
+        """Команды и воркеры читают из основной базы."""
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_safe_requests_read_from_replica(self):
+        """GET без записи читает с реплики и не ставит cookie."""
+        routes, response = self.route(self.factory.get('/'))
+        self.assertEqual(routes, {'read': 'replica'})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_get_with_write_pins_reads(self):
+        """GET с записью дальше читает из основной базы и ставит cookie."""
+        routes, response = self.route(self.factory.get('/'), write=True)
+        self.assertEqual(routes, {
+            'read': 'replica',
+            'write': 'default',
+            'read_after_write': 'default',
+        })
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_writes_pin_reads_to_primary(self):
+        """После записи чтения браузера идут в основную базу."""
+        routes, response = self.route(self.factory.post('/'), write=True)
+        self.assertEqual(routes['read'], 'default')
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 15)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = cookie.value
+        self.assertEqual(self.route(request)[0]['read'], 'default')
+        request.COOKIES[PIN_COOKIE] = str(time.time() - 1)
+        self.assertEqual(self.route(request)[0]['read'], 'replica')
+
+
+# Реплика — та же тестовая база: проверяется только cookie.
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaPinningViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_follow_link_pins_reads(self):
+        """Подписка по ссылке (GET) направляет чтения в основную базу."""
+        profile = reverse('posts:profile', args=[self.author.username])
+        self.assertNotIn(PIN_COOKIE, self.client.get(profile).cookies)
+        response = self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertRedirects(response, profile)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+
+class SyncReplicasTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_sync_copies_primary(self):
+        """Реплика получает копию основной базы."""
+        source = os.path.join(self.directory, 'db.sqlite3')
+        target = os.path.join(self.directory, 'replica.sqlite3')
+        primary = sqlite3.connect(source)
+        primary.execute('CREATE TABLE post (text TEXT)')
+        primary.execute("INSERT INTO post VALUES ('Тестовый текст')")
+        primary.commit()
+        self.addCleanup(primary.close)
+        backup(primary, target)
+        replica = sqlite3.connect(target)
+        self.addCleanup(replica.close)
+        self.assertEqual(
+            replica.execute('SELECT text FROM post').fetchall(),
+            [('Тестовый текст',)],
+        )
+
+    def test_sync_invalidates_feeds(self):
+        """После синхронизации кэш лент, собранный с реплики, сброшен."""
+        generation = feed_generation()
+        replicas_synced.send(sender=self.__class__)
+        self.assertNotEqual(feed_generation(), generation)
+
+
+class QueryMetricsTest(TestCase):
+
+    def test_queries_counted_per_alias(self):
+        """Запросы к базе считаются по её алиасу."""
+        before = query_metrics().get('default', {'queries': 0})['queries']
+        User.objects.count()
+        User.objects.exists()
+        self.assertEqual(
+            query_metrics()['default']['queries'] - before, 2
+        )
+        admin = User.objects.create_superuser('admin', '', 'password')
+        self.client.force_login(admin)
+        response = self.client.get('/metrics/db/')
+        self.assertIn('default', response.json())
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+
+from ..warmup import warm_templates, warm_urls
+
+CACHED_LOADER = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+    ]),
+]
+
+
+class WarmTemplatesTest(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.write('base.html', '{% block content %}{% endblock %}')
+        self.write('includes/item.html', '{{ item }}')
+        self.write(
+            'page.html',
+            '{% extends "base.html" %}{% block content %}'
+            '{% include "includes/item.html" %}{% endblock %}',
+        )
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as template:
+            template.write(text)
+
+    def templates(self):
+        return override_settings(TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [self.directory],
+            'OPTIONS': {'loaders': CACHED_LOADER},
+        }])
+
+    def test_warmed_templates_render_without_files(self):
+        """После прогрева шаблоны с extends и include не читают файлы."""
+        with self.templates():
+            self.assertEqual(
+                warm_templates(),
+                ['base.html', 'page.html', 'includes/item.html'],
+            )
+            shutil.rmtree(self.directory)
+            template = engines['django'].get_template('page.html')
+            self.assertEqual(template.render({'item': 'пост'}), 'пост')
+
+    def test_command_reports_broken_template(self):
+        """Команда сообщает об ошибке в шаблоне."""
+        self.write('broken.html', '{% if %}')
+        with self.templates(), self.assertRaisesMessage(
+            CommandError, 'Ошибка в шаблоне'
+        ):
+            call_command('warm_templates', stdout=StringIO())
+
+
+class WarmUrlsTest(SimpleTestCase):
+
+    def test_reverse_tables_built_for_namespaces(self):
+        """Таблицы reverse() построены для вложенных пространств имён."""
+        warmed = warm_urls()
+        self.assertIn('posts', warmed)
+        self.assertIn('api', warmed)
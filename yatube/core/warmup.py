@@ -0,0 +1,72 @@
+"""Подготовка процесса до того, как он начнёт принимать запросы.
+
+warm_templates() компилирует все шаблоны из папок DIRS каждого движка
+Django. С кэширующим загрузчиком скомпилированные шаблоны остаются
+в памяти процесса, и первый запрос к каждой странице не читает
+и не разбирает файлы. warm_urls() импортирует URLconf со всеми вьюхами
+и строит таблицы reverse() всех пространств имён.
+
+warm_up() делает и то и другое, а затем замораживает объекты для
+сборщика мусора. Если gunicorn запущен с --preload, прогрев
+выполняется один раз в мастере, а воркеры получают готовые объекты
+при fork и делят их страницы памяти, пока не изменят их; без
+--preload каждый воркер прогревается при импорте wsgi.
+"""
+import gc
+import os
+
+from django.db import connections
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import get_resolver
+
+
+def template_names(directory):
+    '''Имена шаблонов в папке относительно неё, в порядке обхода.'''
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith('.html'):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    '''Компилирует шаблоны проекта и возвращает их имена.'''
+    warmed = []
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for directory in backend.engine.dirs:
+            for name in template_names(directory):
+                backend.engine.get_template(name)
+                warmed.append(name)
+    return warmed
+
+
+def warm_urls():
+    '''Строит таблицы reverse(), возвращает пространства имён.'''
+    warmed = []
+    resolvers = [(None, get_resolver())]
+    while resolvers:
+        namespace, resolver = resolvers.pop()
+        # Свойство reverse_dict импортирует вложенные URLconf и вьюхи
+        # и заполняет таблицы при первом обращении.
+        resolver.reverse_dict
+        if namespace:
+            warmed.append(namespace)
+        resolvers += [
+            (name, sub_resolver)
+            for name, (_, sub_resolver) in resolver.namespace_dict.items()
+        ]
+    return warmed
+
+
+def warm_up():
+    warm_templates()
+    warm_urls()
+    # Соединение с базой не должно достаться воркерам через fork.
+    connections.close_all()
+    # Сборщик мусора больше не обходит созданные объекты: иначе он
+    # пишет в их заголовки, и воркеры копируют общие страницы.
+    gc.freeze()
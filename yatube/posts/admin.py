@@ -1,6 +1,11 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
 
+from . import exporter
+from .forms import PostForm
 from .models import Comment, Group, Post
+from .search import search_posts
+from .thumbnails import enqueue
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -15,6 +20,31 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     list_editable = ('group',)
     empty_value_display = '-пусто-'
+    form = PostForm
+    actions = ('export_jsonl',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по search_fields — индекс FTS5.
+        if not search_term:
+            return queryset, False
+        return search_posts(search_term, queryset), False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if 'image' in form.changed_data:
+            enqueue(obj.image)
+
+    def export_jsonl(self, request, queryset):
+        # Ответ отдаётся по мере чтения пачек и не собирается в памяти.
+        response = StreamingHttpResponse(
+            exporter.jsonl_lines(exporter.export_rows(queryset)),
+            content_type='application/x-ndjson; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="posts.jsonl"'
+        )
+        return response
+    export_jsonl.short_description = 'Выгрузить выбранные посты в JSONL'
 
 
 class CommentAdmin(admin.ModelAdmin):
@@ -0,0 +1,127 @@
+"""Условные GET-запросы для лент и страниц постов.
+
+Валидаторы считаются дешевле самой страницы: ленты берут поколение
+лент из кэша, профиль добавляет счётчики автора и подписку,
+страница поста — Post.updated, который сдвигается и правкой поста,
+и комментариями. Last-Modified страницы поста не отдаётся: переименование
+автора или группы меняет страницу, но не дату, и его видит только ETag
+через поколение лент. В ETag входит вариант пользователя, потому что
+шапка и кнопки страницы зависят от него, а у вошедшего пользователя —
+ещё сессия и секрет CSRF: вход меняет оба, и форма из сохранённой
+браузером страницы после нового входа не прошла бы проверку CSRF.
+"""
+import hashlib
+from functools import wraps
+
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .feed_cache import comments_generation, feed_generation
+from .models import AuthorStats, Follow, Post
+
+
+def user_variant(request):
+    if request.user.is_authenticated:
+        # get_token() создаёт секрет, если cookie ещё нет, — тот же,
+        # с которым отрисуется форма.
+        get_token(request)
+        return ':'.join((
+            f'user-{request.user.pk}',
+            request.session.session_key or '',
+            request.META['CSRF_COOKIE'],
+        ))
+    return 'guest'
+
+
+def make_etag(request, *parts):
+    key = ':'.join(map(str, (
+        request.get_full_path(),
+        user_variant(request),
+        feed_generation(),
+        *parts,
+    )))
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def feed_etag(request, *args, **kwargs):
+    return make_etag(request)
+
+
+def profile_etag(request, username):
+    stats = AuthorStats.objects.filter(user__username=username).values_list(
+        'posts_count', 'followers_count', 'following_count'
+    ).first()
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author__username=username
+    ).exists()
+    return make_etag(request, stats, following)
+
+
+def follow_etag(request, *args, **kwargs):
+    # Поколение лент не меняется от подписок, поэтому в ETag
+    # ленты подписок входит и список авторов.
+    if not request.user.is_authenticated:
+        return None
+    authors = Follow.objects.filter(user=request.user).order_by(
+        'author_id'
+    ).values_list('author_id', flat=True)
+    return make_etag(request, list(authors))
+
+
+def with_comments(etag_func):
+    '''ETag ленты, в которой выводится comments_count.
+
+    Комментарий не меняет поколение лент, поэтому такие ленты
+    учитывают ещё поколение комментариев.
+    '''
+    @wraps(etag_func)
+    def etag(request, *args, **kwargs):
+        value = etag_func(request, *args, **kwargs)
+        if value is None:
+            return None
+        key = f'{value}:{comments_generation()}'
+        return hashlib.md5(key.encode()).hexdigest()
+    return etag
+
+
+def post_updated(request, post_id):
+    # API проверяет по нему и существование поста: запрос один.
+    if not hasattr(request, '_post_updated'):
+        request._post_updated = Post.objects.filter(pk=post_id).values_list(
+            'updated', flat=True
+        ).first()
+    return request._post_updated
+
+
+def post_etag(request, post_id):
+    updated = post_updated(request, post_id)
+    if updated is None:
+        return None
+    return make_etag(request, updated.isoformat())
+
+
+def conditional_page(etag_func, last_modified_func=None):
+    '''Отвечает 304 по валидаторам и ставит Cache-Control.
+
+    Страницы гостей могут храниться общими кэшами, страницы
+    пользователей — только браузером; и те и другие проверяются
+    при каждом обращении.
+    '''
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag_func,
+            last_modified_func=last_modified_func,
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,139 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются сигналами при создании и удалении Post, Comment
+и Follow одним UPDATE ... SET field = field ± 1, поэтому страницы
+читают готовые значения вместо COUNT(*). reconcile() пересчитывает
+их по таблицам и исправляет расхождения — все или только у заданных
+авторов, групп и постов.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def change(queryset, field, delta, **extra):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta}, **extra)
+
+
+def change_author_posts(author_id, delta):
+    change(AuthorStats.objects.filter(user_id=author_id), 'posts_count', delta)
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post_comments(post_id, delta):
+    # Комментарий меняет страницу поста, поэтому сдвигает и Post.updated.
+    change(
+        Post.objects.filter(pk=post_id),
+        'comments_count',
+        delta,
+        updated=timezone.now(),
+    )
+
+
+def change_follows(user_id, author_id, delta):
+    change(
+        AuthorStats.objects.filter(user_id=author_id),
+        'followers_count',
+        delta
+    )
+    change(
+        AuthorStats.objects.filter(user_id=user_id),
+        'following_count',
+        delta
+    )
+
+
+def count_of(queryset, field):
+    '''Подзапрос с количеством строк queryset для OuterRef('pk').'''
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(count=Count('pk')).values('count')
+        ),
+        Value(0),
+    )
+
+
+def scoped(queryset, field, ids):
+    '''queryset целиком или только строки с field из ids.'''
+    if ids is None:
+        return queryset
+    return queryset.filter(**{f'{field}__in': ids})
+
+
+def expected_counters(authors=None, groups=None, posts=None):
+    '''Правильные значения счётчиков в виде подзапросов.'''
+    return (
+        (scoped(AuthorStats.objects.all(), 'user_id', authors), {
+            'posts_count': count_of(Post.objects.all(), 'author'),
+            'followers_count': count_of(Follow.objects.all(), 'author'),
+            'following_count': count_of(Follow.objects.all(), 'user'),
+        }),
+        (scoped(Group.objects.all(), 'pk', groups), {
+            'posts_count': count_of(Post.objects.all(), 'group'),
+        }),
+        (scoped(Post.objects.all(), 'pk', posts), {
+            'comments_count': count_of(Comment.objects.all(), 'post'),
+        }),
+    )
+
+
+def reconcile(authors=None, groups=None, posts=None, touch_posts=True):
+    '''Исправляет расхождения счётчиков, возвращает число исправлений.
+
+    authors, groups и posts ограничивают проверку этими id; None —
+    проверить все строки. touch_posts=False оставляет Post.updated
+    исправленных постов как есть.
+    '''
+    missing = scoped(
+        User.objects.filter(stats__isnull=True), 'pk', authors
+    ).values_list('pk', flat=True)
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=user_id) for user_id in missing]
+    )
+    fixed = {}
+    now = timezone.now()
+    for queryset, counters in expected_counters(authors, groups, posts):
+        model_name = queryset.model._meta.model_name
+        for field, expected in counters.items():
+            drifted = list(queryset.annotate(expected=expected).exclude(
+                **{field: F('expected')}
+            ).values_list('pk', flat=True))
+            # Как и в change_post_comments: исправленное число
+            # комментариев меняет страницу поста.
+            extra = {}
+            if queryset.model is Post and touch_posts:
+                extra['updated'] = now
+            fixed[f'{model_name}.{field}'] = queryset.filter(
+                pk__in=drifted
+            ).update(**{field: expected}, **extra)
+    return fixed
+
+
+def author_stats(user):
+    '''Счётчики пользователя; создаёт их, если строки ещё нет.'''
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        stats, _ = AuthorStats.objects.get_or_create(
+            user=user,
+            defaults={
+                'posts_count': Post.objects.filter(author=user).count(),
+                'followers_count': Follow.objects.filter(author=user).count(),
+                'following_count': Follow.objects.filter(user=user).count(),
+            },
+        )
+        user.stats = stats
+        return stats
@@ -0,0 +1,105 @@
+"""Потоковая выгрузка постов и комментариев.
+
+Таблицы читаются пачками по первичному ключу (WHERE id > последний
+ORDER BY id LIMIT n) через values(), поэтому память не растёт
+с размером таблицы, а поздние пачки не дороже ранних, как было бы
+с OFFSET. Строки пишутся в том же формате, который читает
+posts.importer: выгрузку можно загрузить обратно командой
+import_posts.
+"""
+import csv
+import json
+
+from .models import Comment, Post
+
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'pub_date': 'pub_date',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+CSV_FIELDS = ('type', *POST_FIELDS, 'post', 'created')
+
+
+def filter_posts(queryset=None, author=None, group=None, since=None,
+                 until=None):
+    if queryset is None:
+        queryset = Post.objects.all()
+    if author:
+        queryset = queryset.filter(author__username=author)
+    if group:
+        queryset = queryset.filter(group__slug=group)
+    if since:
+        queryset = queryset.filter(pub_date__gte=since)
+    if until:
+        queryset = queryset.filter(pub_date__lt=until)
+    return queryset
+
+
+def keyset_rows(queryset, fields, batch_size):
+    '''Строки queryset пачками по id, ключи — имена полей выгрузки.'''
+    queryset = queryset.order_by('id').values(*fields.values())
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        for row in batch:
+            yield {name: row[lookup] for name, lookup in fields.items()}
+        if len(batch) < batch_size:
+            return
+        last_id = batch[-1]['id']
+
+
+def export_rows(posts, batch_size=1000):
+    '''Посты, затем их комментарии, в формате импорта.'''
+    for row in keyset_rows(posts, POST_FIELDS, batch_size):
+        yield {'type': 'post', **row}
+    comments = Comment.objects.filter(post__in=posts.values('pk'))
+    for row in keyset_rows(comments, COMMENT_FIELDS, batch_size):
+        yield {'type': 'comment', **row}
+
+
+def to_text(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(
+            {key: to_text(value) for key, value in row.items()},
+            ensure_ascii=False,
+        ) + '\n'
+
+
+class Echo:
+    """Файл для csv.writer, который возвращает записанное."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.DictWriter(Echo(), CSV_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(
+            {key: to_text(value) for key, value in row.items()}
+        )
+
+
+LINES = {
+    'jsonl': jsonl_lines,
+    'csv': csv_lines,
+}
@@ -0,0 +1,95 @@
+"""Кэш фрагментов лент и страниц постов с версионной инвалидацией.
+
+Ключ фрагмента ленты включает вьюху, её аргументы, страницу или
+курсор, вариант для гостя или пользователя и номер поколения лент.
+Поколение увеличивается при любом изменении Post, Group или User,
+поэтому старые фрагменты перестают читаться сразу, а сами истекают
+по длинному FEED_CACHE_TIMEOUT.
+
+Фрагменты страницы поста (текст, картинка, первая порция
+комментариев) одинаковы для всех и версионируются самим постом —
+его полем updated.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+FEED_GENERATION_KEY = 'feed:generation'
+# Комментарии меняют только comments_count, которого нет в HTML-лентах,
+# поэтому у них своё поколение: его учитывают ленты API.
+COMMENTS_GENERATION_KEY = 'comments:generation'
+
+
+def generation(key):
+    value = cache.get(key)
+    if value is None:
+        # Начинаем со времени, а не с нуля: после вытеснения ключа
+        # поколение не повторит уже выданное.
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key, time.time_ns())
+    return value
+
+
+def bump_generation(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def feed_generation():
+    return generation(FEED_GENERATION_KEY)
+
+
+def bump_feed_generation():
+    bump_generation(FEED_GENERATION_KEY)
+
+
+def comments_generation():
+    return generation(COMMENTS_GENERATION_KEY)
+
+
+def bump_comments_generation():
+    bump_generation(COMMENTS_GENERATION_KEY)
+
+
+def feed_cache(request, page):
+    '''Таймаут и ключ фрагмента ленты для тега {% cache %}.
+
+    Страница в ключе берётся из уже выбранной page: номер после
+    проверки paginator.get_page или канонический курсор, поэтому
+    произвольные ?page= и ?after= не плодят копий одной страницы.
+    '''
+    match = request.resolver_match
+    variant = 'user' if request.user.is_authenticated else 'guest'
+    if getattr(page, 'is_cursor', False):
+        position = page.position
+    else:
+        position = f'page={page.number}'
+    key = ':'.join((
+        match.view_name,
+        *(f'{name}={value}' for name, value in sorted(match.kwargs.items())),
+        position,
+        variant,
+        str(feed_generation()),
+    ))
+    return {
+        'timeout': settings.FEED_CACHE_TIMEOUT,
+        'key': key,
+    }
+
+
+def post_cache(post):
+    '''Таймаут и ключ фрагментов страницы поста для тега {% cache %}.
+
+    Post.updated сдвигают правка поста, добавление, изменение
+    и удаление комментария и готовые миниатюры, поэтому отдельный
+    счётчик версий не нужен. Пока реплика отстаёт, пост читается с неё
+    со старым updated, и в кэш не попадёт старая страница под новым
+    ключом.
+    '''
+    return {
+        'timeout': settings.POST_CACHE_TIMEOUT,
+        'key': f'{post.pk}:{post.updated.isoformat()}',
+    }
@@ -1,6 +1,8 @@
 from django import forms
+from django.core.exceptions import ValidationError
 
 from .models import Comment, Post
+from .uploads import check_image_pixels, check_image_size
 
 
 class PostForm(forms.ModelForm):
@@ -12,6 +14,28 @@ class PostForm(forms.ModelForm):
             'image',
         )
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # У новой загрузки ImageField оставляет открытую картинку
+        # с размерами из заголовка.
+        if hasattr(image, 'image'):
+            check_image_pixels(image)
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = self.files.get(self.add_prefix('image'))
+        if upload is None:
+            return cleaned_data
+        try:
+            check_image_size(upload)
+        except ValidationError as error:
+            # Файл сверх лимита записан не целиком, и ImageField
+            # мог счесть его битым: показываем настоящую причину.
+            self.errors.pop('image', None)
+            self.add_error('image', error)
+        return cleaned_data
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
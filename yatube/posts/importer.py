@@ -0,0 +1,273 @@
+"""Потоковый импорт постов, комментариев и подписок.
+
+Строки читаются из JSONL или CSV по одной и копятся в пачки, которые
+пишутся bulk_create в отдельных транзакциях. Авторы и группы ищутся
+в словарях, загруженных один раз; неизвестные создаются на ходу.
+bulk_create не отправляет сигналов, поэтому импортёр запоминает
+затронутых авторов, группы, посты и подписки, а в конце импорта один
+раз пересчитывает их счётчики, сдвигает updated у прежних постов
+с новыми комментариями, раскладывает новые посты и подписки по лентам и
+сбрасывает поколение лент. Анонс и HTML текста рендерятся при разборе
+строки. Полнотекстовый индекс поддерживают триггеры базы.
+
+Поле type строки выбирает, что она описывает (по умолчанию post):
+
+    post     text, author, group, pub_date, image, id
+    comment  post, author, text, created
+    follow   user, author
+"""
+import csv
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, rendering, timeline
+from .feed_cache import bump_feed_generation
+from .models import Comment, Follow, Group, Post, ThumbnailJob
+
+User = get_user_model()
+
+# Порядок записи пачек: комментарии ссылаются на посты из этого же
+# файла, поэтому посты пишутся первыми.
+KINDS = ('post', 'comment', 'follow')
+
+
+class ImportRowError(ValueError):
+    """Строка файла не может быть импортирована."""
+
+    def __init__(self, line, message):
+        super().__init__(f'строка {line}: {message}')
+
+
+def read_rows(stream, format):
+    '''Строки файла в виде словарей, с номерами строк.'''
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, text in enumerate(stream, 1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as error:
+            raise ImportRowError(line, f'некорректный JSON ({error})')
+        if not isinstance(row, dict):
+            raise ImportRowError(line, 'ожидается объект JSON')
+        yield line, row
+
+
+@contextmanager
+def preserved_dates(*fields):
+    '''Отключает auto_now и auto_now_add, чтобы сохранить даты из файла.'''
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+def parse_date(line, value):
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise ImportRowError(line, f'некорректная дата {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def required(line, row, field):
+    value = row.get(field)
+    if value in (None, ''):
+        raise ImportRowError(line, f'не заполнено поле {field}')
+    return value
+
+
+class Importer:
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.pending = {kind: [] for kind in KINDS}
+        self.images = []
+        self.imported = dict.fromkeys(KINDS, 0)
+        # Что обновить в конце импорта вместо сигналов.
+        self.touched = {
+            'authors': set(),
+            'groups': set(),
+            'commented': set(),
+            'new_posts': set(),
+            'follows': set(),
+        }
+
+    def user_id(self, username):
+        if username not in self.users:
+            user = User(username=username)
+            user.set_unusable_password()
+            user.save()
+            self.users[username] = user.pk
+        return self.users[username]
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        if slug not in self.groups:
+            self.groups[slug] = Group.objects.create(
+                title=slug, slug=slug, description=''
+            ).pk
+        return self.groups[slug]
+
+    def build_post(self, line, row):
+        pub_date = parse_date(line, row.get('pub_date'))
+        image = row.get('image') or ''
+        if image:
+            self.images.append(image)
+        post = Post(
+            pk=row.get('id') or None,
+            text=required(line, row, 'text'),
+            author_id=self.user_id(required(line, row, 'author')),
+            group_id=self.group_id(row.get('group')),
+            pub_date=pub_date,
+            updated=pub_date,
+            image=image,
+        )
+        rendering.render_text(post)
+        return post
+
+    def build_comment(self, line, row):
+        return Comment(
+            post_id=required(line, row, 'post'),
+            author_id=self.user_id(required(line, row, 'author')),
+            text=required(line, row, 'text'),
+            created=parse_date(line, row.get('created')),
+        )
+
+    def build_follow(self, line, row):
+        user_id = self.user_id(required(line, row, 'user'))
+        author_id = self.user_id(required(line, row, 'author'))
+        if user_id == author_id:
+            raise ImportRowError(line, 'нельзя подписаться на себя')
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def add(self, line, row):
+        kind = row.get('type') or 'post'
+        if kind not in KINDS:
+            raise ImportRowError(line, f'неизвестный тип {kind!r}')
+        self.pending[kind].append(
+            getattr(self, f'build_{kind}')(line, row)
+        )
+        if len(self.pending[kind]) >= self.batch_size:
+            self.flush()
+
+    @transaction.atomic
+    def flush(self):
+        posts = self.pending['post']
+        # SQLite не возвращает id из bulk_create: новые посты — это
+        # заданные в файле id и всё, что выше прежнего максимума.
+        last_id = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        Post.objects.bulk_create(posts)
+        Comment.objects.bulk_create(self.pending['comment'])
+        Follow.objects.bulk_create(
+            self.pending['follow'], ignore_conflicts=True
+        )
+        ThumbnailJob.objects.bulk_create(
+            [ThumbnailJob(image=name) for name in self.images],
+            ignore_conflicts=True,
+        )
+        if posts:
+            self.touched['new_posts'].update(
+                Post.objects.filter(
+                    Q(pk__gt=last_id)
+                    | Q(pk__in=[post.pk for post in posts if post.pk])
+                ).values_list('pk', flat=True)
+            )
+        self.remember()
+        for kind, objects in self.pending.items():
+            self.imported[kind] += len(objects)
+            objects.clear()
+        self.images.clear()
+
+    def remember(self):
+        touched = self.touched
+        for post in self.pending['post']:
+            touched['authors'].add(post.author_id)
+            if post.group_id is not None:
+                touched['groups'].add(post.group_id)
+        for comment in self.pending['comment']:
+            touched['commented'].add(int(comment.post_id))
+        for follow in self.pending['follow']:
+            touched['authors'].update((follow.user_id, follow.author_id))
+            touched['follows'].add((follow.user_id, follow.author_id))
+
+    def finish(self):
+        '''Делает для записанных пачек то, что при сохранении — сигналы.
+
+        Работа идёт порциями по batch_size id, каждая — в своей
+        транзакции, чтобы не держать блокировку записи на весь остаток.
+        '''
+        touched = self.touched
+        for authors in chunks(touched['authors'], self.batch_size):
+            with transaction.atomic():
+                counters.reconcile(authors=authors, groups=[], posts=[])
+        for groups in chunks(touched['groups'], self.batch_size):
+            with transaction.atomic():
+                counters.reconcile(authors=[], groups=groups, posts=[])
+        for posts in chunks(touched['commented'], self.batch_size):
+            with transaction.atomic():
+                counters.reconcile(
+                    authors=[], groups=[], posts=posts, touch_posts=False
+                )
+                # Как counters.change_post_comments: по updated проверяются
+                # кэш и ETag страницы поста. У постов из этого же файла
+                # кэша ещё нет, и дата из файла остаётся.
+                Post.objects.filter(pk__in=posts).exclude(
+                    pk__in=[pk for pk in posts if pk in touched['new_posts']]
+                ).update(updated=timezone.now())
+        # Подписчиков считают счётчики, поэтому ленты — после них.
+        for posts in chunks(touched['new_posts'], self.batch_size):
+            with transaction.atomic():
+                timeline.fan_out_posts(Post.objects.filter(pk__in=posts))
+        for follows in chunks(touched['follows'], self.batch_size):
+            with transaction.atomic():
+                for user_id, author_id in follows:
+                    timeline.backfill(user_id, author_id)
+        bump_feed_generation()
+
+
+def chunks(values, size):
+    values = sorted(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def import_rows(rows, batch_size=1000):
+    '''Импортирует строки read_rows(), возвращает число по типам.
+
+    При ошибке уже записанные пачки остаются в базе, и для них всё
+    равно обновляются счётчики, ленты и кэш.
+    '''
+    importer = Importer(batch_size)
+    try:
+        with preserved_dates(
+            Post._meta.get_field('pub_date'),
+            Post._meta.get_field('updated'),
+            Comment._meta.get_field('created'),
+        ):
+            for line, row in rows:
+                importer.add(line, row)
+            importer.flush()
+    finally:
+        importer.finish()
+    return importer.imported
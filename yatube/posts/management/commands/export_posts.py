@@ -0,0 +1,82 @@
+import gzip
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from posts import exporter
+
+
+def aware_date(value):
+    date = parse_date(value)
+    if date is None:
+        raise ValueError(value)
+    return timezone.make_aware(datetime.combine(date, datetime.min.time()))
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты и их комментарии в JSONL или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл для выгрузки, «-» — стандартный вывод',
+        )
+        parser.add_argument(
+            '--format',
+            choices=tuple(exporter.LINES),
+            help='Формат файла; по умолчанию по расширению, иначе jsonl',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать gzip; включается и расширением .gz',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк читать одним запросом',
+        )
+        parser.add_argument('--author', help='Имя пользователя автора')
+        parser.add_argument('--group', help='Слаг группы')
+        parser.add_argument(
+            '--since', type=aware_date, help='Посты с этой даты, ГГГГ-ММ-ДД'
+        )
+        parser.add_argument(
+            '--until', type=aware_date, help='Посты до этой даты, ГГГГ-ММ-ДД'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        compress = options['gzip'] or path.endswith('.gz')
+        name = path[:-len('.gz')] if path.endswith('.gz') else path
+        format = options['format']
+        if format is None:
+            format = 'csv' if name.endswith('.csv') else 'jsonl'
+        posts = exporter.filter_posts(
+            author=options['author'],
+            group=options['group'],
+            since=options['since'],
+            until=options['until'],
+        )
+        self.exported = 0
+        lines = exporter.LINES[format](
+            self.count(exporter.export_rows(posts, options['batch_size']))
+        )
+        if path == '-':
+            if compress:
+                raise CommandError('gzip пишется только в файл')
+            for line in lines:
+                self.stdout.write(line, ending='')
+        else:
+            opener = gzip.open if compress else open
+            with opener(path, 'wt', encoding='utf-8', newline='') as output:
+                output.writelines(lines)
+        self.stderr.write(f'Выгружено строк: {self.exported}')
+
+    def count(self, rows):
+        for row in rows:
+            self.exported += 1
+            yield row
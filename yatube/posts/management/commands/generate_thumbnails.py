@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры для всех картинок постов'
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        done = failed = 0
+        for name in images.iterator():
+            if thumbnails.generate(name):
+                done += 1
+            else:
+                failed += 1
+        self.stdout.write(
+            f'Картинок обработано: {done}, пропущено: {failed}'
+        )
@@ -0,0 +1,66 @@
+import gzip
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = 'Импортирует посты, комментарии и подписки из JSONL или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл для импорта (можно .gz), «-» — стандартный ввод',
+        )
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='Формат файла; по умолчанию по расширению, иначе jsonl',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк записывать в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        name = path[:-len('.gz')] if path.endswith('.gz') else path
+        format = options['format']
+        if format is None:
+            format = 'csv' if name.endswith('.csv') else 'jsonl'
+        started = time.perf_counter()
+        if path == '-':
+            imported = self.run(sys.stdin, format, options['batch_size'])
+        else:
+            if not os.path.exists(path):
+                raise CommandError(f'Файл {path} не найден')
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8', newline='') as stream:
+                imported = self.run(stream, format, options['batch_size'])
+        elapsed = time.perf_counter() - started
+        total = sum(imported.values())
+        for kind, count in imported.items():
+            self.stdout.write(f'{kind}: импортировано {count}')
+        self.stdout.write(
+            f'Строк: {total} за {elapsed:.1f} с, '
+            f'{total / elapsed:.0f} строк в секунду'
+        )
+
+    def run(self, stream, format, batch_size):
+        try:
+            return importer.import_rows(
+                importer.read_rows(stream, format), batch_size
+            )
+        except importer.ImportRowError as error:
+            raise CommandError(f'Ошибка импорта, {error}')
+        except IntegrityError as error:
+            raise CommandError(
+                f'Пачка не записана, записи противоречат базе: {error}'
+            )
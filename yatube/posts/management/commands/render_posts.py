@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import rendering
+from posts.feed_cache import bump_feed_generation
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заново рендерит анонсы и HTML текстов всех постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько постов обновлять в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        rendered = rendering.backfill(Post, options['batch_size'])
+        # Во фрагментах кэша лент остались старые анонсы.
+        bump_feed_generation()
+        self.stdout.write(f'Перерисовано постов: {rendered}')
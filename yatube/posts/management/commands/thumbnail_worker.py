@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры картинок из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать очередь один раз и выйти',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=50,
+            help='Сколько заданий забирать за раз',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = thumbnails.process(options['batch'])
+            if processed:
+                self.stdout.write(f'Обработано картинок: {processed}')
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['sleep'])
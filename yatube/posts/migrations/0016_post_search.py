@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# unicode61 не считает «ё» буквой «е» с диакритикой, поэтому текст
+# приводится к «е» перед индексацией, а запрос — в posts.search.
+FOLD_NEW = "replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е')"
+FOLD_OLD = "replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е')"
+
+CREATE_INDEX = [
+    '''
+    CREATE VIRTUAL TABLE posts_post_fts USING fts5(
+        text,
+        content='posts_post',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    ''',
+    f'''
+    CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, {FOLD_NEW});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, {FOLD_OLD});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text ON posts_post
+    WHEN old.text IS NOT new.text
+    BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, {FOLD_OLD});
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, {FOLD_NEW});
+    END
+    ''',
+    '''
+    INSERT INTO posts_post_fts(rowid, text)
+    SELECT id, replace(replace(text, 'ё', 'е'), 'Ё', 'Е') FROM posts_post
+    ''',
+]
+
+DROP_INDEX = [
+    'DROP TRIGGER posts_post_fts_update',
+    'DROP TRIGGER posts_post_fts_delete',
+    'DROP TRIGGER posts_post_fts_insert',
+    'DROP TABLE posts_post_fts',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_thumbnailjob'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_INDEX, DROP_INDEX),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+# Триггеры полнотекстового индекса в том виде, в каком их создала
+# 0016_post_search; копия, а не импорт из posts.search, чтобы
+# миграция не менялась вместе с кодом.
+FOLD_NEW = "replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е')"
+FOLD_OLD = "replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е')"
+
+CREATE_TRIGGERS = [
+    f'''
+    CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, {FOLD_NEW});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, {FOLD_OLD});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text ON posts_post
+    WHEN old.text IS NOT new.text
+    BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, {FOLD_OLD});
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, {FOLD_NEW});
+    END
+    ''',
+]
+
+DROP_TRIGGERS = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+]
+
+
+def fill_updated(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_search'),
+    ]
+
+    # AddField в SQLite пересоздаёт posts_post вместе с триггерами
+    # полнотекстового индекса.
+    operations = [
+        migrations.RunSQL(DROP_TRIGGERS, CREATE_TRIGGERS),
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name='Дата изменения',
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated, migrations.RunPython.noop),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
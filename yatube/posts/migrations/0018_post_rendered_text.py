@@ -0,0 +1,106 @@
+from django.db import migrations, models
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+# Правила рендеринга на момент миграции (posts.rendering
+# и POST_EXCERPT_WORDS). Посты, сохранённые позже, рендерит сигнал,
+# а после смены правил — команда render_posts.
+EXCERPT_WORDS = 30
+ELLIPSIS = ' …'
+BATCH_SIZE = 1000
+
+# Триггеры полнотекстового индекса, как в 0017_post_updated.
+FOLD_NEW = "replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е')"
+FOLD_OLD = "replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е')"
+
+CREATE_TRIGGERS = [
+    f'''
+    CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, {FOLD_NEW});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, {FOLD_OLD});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text ON posts_post
+    WHEN old.text IS NOT new.text
+    BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, {FOLD_OLD});
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, {FOLD_NEW});
+    END
+    ''',
+]
+
+DROP_TRIGGERS = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+]
+
+
+def render_texts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    last_id = 0
+    while True:
+        posts = list(
+            Post.objects.filter(pk__gt=last_id)
+            .order_by('pk')
+            .only('pk', 'text')[:BATCH_SIZE]
+        )
+        if not posts:
+            return
+        for post in posts:
+            post.excerpt = Truncator(post.text).words(
+                EXCERPT_WORDS, truncate=ELLIPSIS
+            )
+            post.excerpt_truncated = len(post.text.split()) > EXCERPT_WORDS
+            post.text_html = linebreaks(post.text, autoescape=True)
+        Post.objects.bulk_update(
+            posts, ('excerpt', 'excerpt_truncated', 'text_html')
+        )
+        last_id = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_updated'),
+    ]
+
+    # AddField в SQLite пересоздаёт posts_post вместе с триггерами
+    # полнотекстового индекса.
+    operations = [
+        migrations.RunSQL(DROP_TRIGGERS, CREATE_TRIGGERS),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(
+                default='', editable=False, verbose_name='Анонс'
+            ),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt_truncated',
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                verbose_name='Анонс короче текста',
+            ),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(
+                default='', editable=False, verbose_name='Текст в HTML'
+            ),
+        ),
+        migrations.RunPython(render_texts, migrations.RunPython.noop),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -11,11 +11,40 @@ class Group(models.Model):
     description = models.TextField(
         verbose_name='Описание',
     )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False,
+    )
 
     def __str__(self):
         return self.title
 
 
+# Колонки, которые выводят шаблоны лент: анонс и картинка поста, имя
+# автора и ссылка на группу. Остальные (полный текст, updated,
+# comments_count, поля пользователя вроде пароля) в ленту не читаются.
+FEED_FIELDS = (
+    'excerpt',
+    'excerpt_truncated',
+    'pub_date',
+    'image',
+    'author',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group',
+    'group__slug',
+)
+
+
+class PostQuerySet(models.QuerySet):
+
+    def for_feed(self):
+        '''Посты для лент: автор и группа — одним JOIN, без лишних колонок.'''
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -25,6 +54,12 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    # Меняется и при правке поста, и при добавлении или удалении
+    # комментария: по нему строится ETag страницы поста.
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -44,11 +79,52 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    # Заполняются из text при сохранении, см. posts.rendering.
+    excerpt = models.TextField(
+        'Анонс',
+        default='',
+        editable=False,
+    )
+    excerpt_truncated = models.BooleanField(
+        'Анонс короче текста',
+        default=False,
+        editable=False,
+    )
+    text_html = models.TextField(
+        'Текст в HTML',
+        default='',
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ("-pub_date",)
+        # Индексы повторяют порядок лент: (pub_date, id) для главной,
+        # (author, pub_date) для профиля и (group, pub_date) для группы,
+        # поэтому лента читается по индексу без сортировки во временном
+        # B-дереве.
+        ordering = ("-pub_date", "-id")
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='post_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', 'pub_date'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -75,6 +151,14 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx',
+            ),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -91,6 +175,14 @@ class Follow(models.Model):
     )
 
     class Meta:
+        # Проверка подписки идёт по уникальному (user, author),
+        # выборка подписчиков автора — по (author, user).
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=[
@@ -100,3 +192,87 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        db_index=True,
+    )
+    following_count = models.PositiveIntegerField(
+        'Количество подписок',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики автора'
+        verbose_name_plural = 'Счётчики авторов'
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='+',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    'user',
+                    'post'
+                ],
+                name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_feed_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx',
+            ),
+        ]
+
+
+class ThumbnailJob(models.Model):
+    """Картинка поста, для которой ещё не построены миниатюры."""
+    image = models.CharField('Картинка', max_length=255, unique=True)
+    created = models.DateTimeField('Поставлено в очередь', auto_now_add=True)
+    claimed = models.DateTimeField('Взято воркером', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'Задание на миниатюры'
+        verbose_name_plural = 'Задания на миниатюры'
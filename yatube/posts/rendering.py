@@ -0,0 +1,69 @@
+"""Готовые к выводу версии текста поста.
+
+Текст рендерится один раз при сохранении поста, а не в каждом
+запросе: ленты выводят короткий анонс excerpt и ссылку «Читать
+дальше», если текст длиннее, а страница поста — text_html, текст
+с экранированным HTML, разбитый на абзацы. bulk_create не отправляет
+сигналов, поэтому импорт и генераторы данных вызывают render_text
+сами. После смены правил рендеринга старые посты перерисовывает
+`manage.py render_posts`.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+RENDERED_FIELDS = ('excerpt', 'excerpt_truncated', 'text_html')
+
+# То же многоточие, что и у фильтра truncatewords.
+ELLIPSIS = ' …'
+
+
+def rendered(text):
+    '''Значения RENDERED_FIELDS для текста поста.'''
+    limit = settings.POST_EXCERPT_WORDS
+    return {
+        'excerpt': Truncator(text).words(limit, truncate=ELLIPSIS),
+        'excerpt_truncated': len(text.split()) > limit,
+        'text_html': linebreaks(text, autoescape=True),
+    }
+
+
+def render_text(post):
+    for name, value in rendered(post.text).items():
+        setattr(post, name, value)
+
+
+def backfill(model, batch_size=1000):
+    '''Перерисовывает тексты всех постов пачками, возвращает число
+    изменившихся.
+
+    Принимает модель, чтобы работать и с историческими моделями
+    миграций. Пачки идут по id, каждая — в своей транзакции. У постов,
+    чей рендер изменился, сдвигается updated: от него зависят ключи
+    кэша страницы поста и её ETag.
+    '''
+    last_id = 0
+    rendered_count = 0
+    while True:
+        posts = list(
+            model.objects.filter(pk__gt=last_id)
+            .order_by('pk')
+            .only('pk', 'text', *RENDERED_FIELDS)[:batch_size]
+        )
+        if not posts:
+            return rendered_count
+        now = timezone.now()
+        changed = []
+        for post in posts:
+            values = rendered(post.text)
+            if any(getattr(post, name) != values[name] for name in values):
+                for name, value in values.items():
+                    setattr(post, name, value)
+                post.updated = now
+                changed.append(post)
+        with transaction.atomic():
+            model.objects.bulk_update(changed, (*RENDERED_FIELDS, 'updated'))
+        rendered_count += len(changed)
+        last_id = posts[-1].pk
@@ -0,0 +1,189 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Таблица posts_post_fts хранит только индекс по Post.text (external
+content) и обновляется триггерами из миграции 0016_post_search.
+Запрос пользователя разбивается на слова, каждое ищется как префикс,
+результаты сортируются по релевантности bm25. Буква «ё» и в индексе,
+и в запросе заменяется на «е».
+"""
+import re
+
+from django.db import connection, transaction
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+WORD = re.compile(r'\w+')
+FOLDED_TEXT = "replace(replace(text, 'ё', 'е'), 'Ё', 'Е')"
+
+# Перестройка пишет новый индекс в теневую таблицу. Пока она идёт,
+# временные триггеры переносят в тень правки уже скопированных
+# постов: до них в PROGRESS_TABLE id, докуда дошли пачки. Остальные
+# посты тень получит из следующих пачек, а 'delete' для строки, которой
+# в индексе нет, испортил бы его.
+SHADOW_TABLE = 'posts_post_fts_new'
+PROGRESS_TABLE = 'posts_post_fts_progress'
+COPIED = f'(SELECT last_id FROM {PROGRESS_TABLE})'
+FOLD_NEW = "replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е')"
+FOLD_OLD = "replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е')"
+SHADOW_TRIGGERS = [
+    f'''
+    CREATE TRIGGER {SHADOW_TABLE}_insert AFTER INSERT ON posts_post
+    WHEN new.id <= {COPIED}
+    BEGIN
+        INSERT INTO {SHADOW_TABLE}(rowid, text) VALUES (new.id, {FOLD_NEW});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER {SHADOW_TABLE}_delete AFTER DELETE ON posts_post
+    WHEN old.id <= {COPIED}
+    BEGIN
+        INSERT INTO {SHADOW_TABLE}({SHADOW_TABLE}, rowid, text)
+        VALUES ('delete', old.id, {FOLD_OLD});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER {SHADOW_TABLE}_update AFTER UPDATE OF text ON posts_post
+    WHEN old.text IS NOT new.text AND old.id <= {COPIED}
+    BEGIN
+        INSERT INTO {SHADOW_TABLE}({SHADOW_TABLE}, rowid, text)
+        VALUES ('delete', old.id, {FOLD_OLD});
+        INSERT INTO {SHADOW_TABLE}(rowid, text) VALUES (new.id, {FOLD_NEW});
+    END
+    ''',
+]
+DROP_SHADOW = [
+    f'DROP TRIGGER IF EXISTS {SHADOW_TABLE}_update',
+    f'DROP TRIGGER IF EXISTS {SHADOW_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {SHADOW_TABLE}_insert',
+    f'DROP TABLE IF EXISTS {PROGRESS_TABLE}',
+    f'DROP TABLE IF EXISTS {SHADOW_TABLE}',
+]
+
+
+def fold(text):
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def match_query(query):
+    '''Безопасное выражение MATCH из пользовательского ввода.
+
+    Операторы FTS5 (AND, NEAR, кавычки, двоеточия) не передаются:
+    каждое слово берётся в кавычки и ищется по префиксу.
+    '''
+    return ' '.join(f'"{word}"*' for word in WORD.findall(fold(query)))
+
+
+def search_posts(query, queryset=None):
+    '''Посты, подходящие под запрос, от более релевантных к менее.'''
+    if queryset is None:
+        queryset = Post.objects.all()
+    expression = match_query(query)
+    if not expression:
+        return queryset.none()
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = posts_post.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[expression],
+        select={'rank': f'{FTS_TABLE}.rank'},
+        order_by=['rank', '-pub_date', '-id'],
+    )
+
+
+def rebuild(batch_size=1000):
+    '''Переиндексирует все посты, возвращает их число.
+
+    Новый индекс строится в теневой таблице пачками, каждая в своей
+    транзакции, поэтому блокировка записи не держится на всё время
+    перестройки, а поиск до конца работает по старому индексу. Последняя
+    транзакция дописывает остаток и подменяет индекс вместе с его
+    триггерами. Команда 'rebuild' FTS5 не подходит — она индексирует
+    текст без замены «ё».
+    '''
+    start_rebuild()
+    indexed = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            copied = copy_batch(cursor, batch_size)
+        if not copied:
+            break
+        indexed += copied
+    indexed += finish_rebuild()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+        )
+    return indexed
+
+
+def start_rebuild():
+    '''Создаёт пустую теневую таблицу индекса и её триггеры.'''
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Остатки перестройки, прерванной на середине.
+        for sql in DROP_SHADOW:
+            cursor.execute(sql)
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' "
+            'AND name = %s',
+            [FTS_TABLE],
+        )
+        cursor.execute(cursor.fetchone()[0].replace(
+            FTS_TABLE, SHADOW_TABLE, 1
+        ))
+        cursor.execute(f'CREATE TABLE {PROGRESS_TABLE} (last_id INTEGER)')
+        cursor.execute(f'INSERT INTO {PROGRESS_TABLE} VALUES (0)')
+        for sql in SHADOW_TRIGGERS:
+            cursor.execute(sql)
+
+
+def finish_rebuild():
+    '''Дописывает остаток в тень и подменяет ею индекс.
+
+    Возвращает число дописанных постов.
+    '''
+    with transaction.atomic(), connection.cursor() as cursor:
+        copied = copy_batch(cursor, None)
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = 'posts_post'"
+        )
+        triggers = [
+            (name, sql) for name, sql in cursor.fetchall()
+            if name.startswith(f'{FTS_TABLE}_')
+            and not name.startswith(SHADOW_TABLE)
+        ]
+        for sql in DROP_SHADOW[:-1]:
+            cursor.execute(sql)
+        for name, _ in triggers:
+            cursor.execute(f'DROP TRIGGER {name}')
+        cursor.execute(f'DROP TABLE {FTS_TABLE}')
+        cursor.execute(f'ALTER TABLE {SHADOW_TABLE} RENAME TO {FTS_TABLE}')
+        for _, sql in triggers:
+            cursor.execute(sql)
+    return copied
+
+
+def copy_batch(cursor, batch_size):
+    '''Копирует в тень следующие batch_size постов, None — все.'''
+    cursor.execute(f'SELECT last_id FROM {PROGRESS_TABLE}')
+    last_id = cursor.fetchone()[0]
+    cursor.execute(
+        'SELECT MAX(id) FROM (SELECT id FROM posts_post WHERE id > %s '
+        'ORDER BY id LIMIT %s)',
+        [last_id, -1 if batch_size is None else batch_size],
+    )
+    upper_id = cursor.fetchone()[0]
+    if upper_id is None:
+        return 0
+    cursor.execute(
+        f'INSERT INTO {SHADOW_TABLE}(rowid, text) '
+        f'SELECT id, {FOLDED_TEXT} FROM posts_post '
+        'WHERE id > %s AND id <= %s',
+        [last_id, upper_id],
+    )
+    copied = cursor.rowcount
+    cursor.execute(f'UPDATE {PROGRESS_TABLE} SET last_id = %s', [upper_id])
+    return copied
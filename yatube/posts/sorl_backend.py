@@ -0,0 +1,29 @@
+"""Бэкенд sorl для конвейера миниатюр; загружается posts.thumbnails."""
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+
+class PipelineBackend(ThumbnailBackend):
+    '''Бэкенд sorl, умеющий читать миниатюру, не создавая её.'''
+
+    def _options(self, source, options):
+        # Те же значения по умолчанию, что и в ThumbnailBackend.get_thumbnail,
+        # иначе имя миниатюры не совпадёт с созданной.
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        options = self._options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
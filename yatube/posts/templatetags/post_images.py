@@ -0,0 +1,17 @@
+from django import template
+from django.conf import settings
+
+from posts.thumbnails import responsive_image
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/thumbnail.html')
+def post_image(image, geometry='feed'):
+    width, height = settings.THUMBNAIL_GEOMETRIES[geometry]['size']
+    return {
+        'image': image,
+        'picture': responsive_image(image, geometry),
+        'width': width,
+        'height': height,
+    }
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post
+
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Bilbo')
+        cls.user = User.objects.create_user(username='Frodo')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый текст',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def assert_revalidates(self, client, url):
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        return etag
+
+    def test_feeds_return_not_modified(self):
+        '''Неизменившиеся страницы отдаются ответом 304'''
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        for url in urls:
+            for client in (self.guest_client, self.authorized_client):
+                with self.subTest(url=url):
+                    self.assert_revalidates(client, url)
+
+    def test_new_post_changes_feed_etag(self):
+        '''Новый пост меняет ETag ленты'''
+        url = reverse('posts:index')
+        etag = self.assert_revalidates(self.guest_client, url)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый пост')
+
+    def test_comment_changes_post_validators(self):
+        '''Комментарий меняет ETag страницы поста'''
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.assert_revalidates(self.guest_client, url)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Комментарий')
+
+    def test_author_rename_changes_post_page(self):
+        '''Переименование автора не даёт отдать страницу поста из кэша'''
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        response = self.guest_client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Переименованный'
+        author.save()
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertContains(response, 'Переименованный')
+
+    def test_new_login_changes_post_validators(self):
+        '''После нового входа страница с формой отдаётся заново'''
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.assert_revalidates(self.authorized_client, url)
+        response = self.authorized_client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        self.authorized_client.logout()
+        self.authorized_client.force_login(self.user)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_profile_etag(self):
+        '''Подписка меняет ETag профиля'''
+        url = reverse('posts:profile', args=[self.author.username])
+        etag = self.assert_revalidates(self.authorized_client, url)
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_cache_control_depends_on_user(self):
+        '''Гостевые ответы публичные, ответы пользователю — приватные'''
+        url = reverse('posts:index')
+        guest = self.guest_client.get(url)
+        user = self.authorized_client.get(url)
+        self.assertIn('public', guest['Cache-Control'])
+        self.assertIn('private', user['Cache-Control'])
+        self.assertIn('Cookie', user['Vary'])
+        self.assertNotEqual(guest['ETag'], user['ETag'])
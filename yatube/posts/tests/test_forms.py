@@ -1,13 +1,23 @@
+import os
 import shutil
 import tempfile
+import tracemalloc
+from io import BytesIO, StringIO
 
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template.defaultfilters import filesizeformat
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse
+from PIL import Image
 
-from ..models import Comment, Group, Post
+from core.queries import QueryRecorder
+
+from .. import thumbnails
+from ..forms import PostForm
+from ..models import Comment, Group, Post, ThumbnailJob
 
 
 User = get_user_model()
@@ -120,6 +130,26 @@ class PostCreateFormTests(TestCase):
         self.assertNotEqual(post.text, changed_post.text)
         self.assertNotEqual(post.group.id, changed_post.group.id)
 
+    def test_form_pages_do_not_open_transaction(self):
+        '''Страницы с формой и неверная форма не берут блокировку записи'''
+        post = Post.objects.create(author=self.user, text='Тестовый текст')
+        requests = (
+            ('get', reverse('posts:post_create'), {}),
+            ('get', reverse('posts:post_edit', args=[post.pk]), {}),
+            ('post', reverse('posts:post_create'), {'text': ''}),
+        )
+        for method, url, data in requests:
+            with self.subTest(method=method, url=url):
+                with QueryRecorder() as recorder:
+                    response = getattr(self.authorized_client, method)(
+                        url, data
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse([
+                    sql for sql, _ in recorder.queries
+                    if sql.startswith('SAVEPOINT')
+                ])
+
     def test_guest_client_try_to_edit_post(self):
         '''Проверяем, что неавторизованный пользователь
         не может редактировать пост'''
@@ -182,3 +212,213 @@ class PostCreateFormTests(TestCase):
         )
         self.assertEqual(Comment.objects.count(), comments_count)
         self.assertRedirects(response, '/auth/login/?next=/posts/1/comment/')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_PIPELINE_EAGER=False,
+)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self):
+        image = BytesIO()
+        Image.new('RGB', (40, 20), 'red').save(image, 'PNG')
+        uploaded = SimpleUploadedFile(
+            name='thumb.png',
+            content=image.getvalue(),
+            content_type='image/png'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'test', 'image': uploaded},
+        )
+        return Post.objects.get(text='test')
+
+    def test_upload_enqueues_thumbnails(self):
+        '''Загрузка картинки ставит миниатюры в очередь, а не строит их'''
+        post = self.create_post()
+        self.assertTrue(
+            ThumbnailJob.objects.filter(image=post.image.name).exists()
+        )
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertContains(response, 'thumbnail-placeholder.svg')
+
+    def test_worker_generates_thumbnails(self):
+        '''Воркер строит миниатюры и убирает задание из очереди'''
+        post = self.create_post()
+        call_command('thumbnail_worker', once=True, stdout=StringIO())
+        self.assertFalse(ThumbnailJob.objects.exists())
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertNotContains(response, 'thumbnail-placeholder.svg')
+        self.assertContains(response, settings.MEDIA_URL + 'cache/')
+
+    @override_settings(
+        THUMBNAIL_JOB_ATTEMPTS=2,
+        THUMBNAIL_GEOMETRIES={'feed': {
+            **settings.THUMBNAIL_GEOMETRIES['feed'], 'formats': ('XYZ',),
+        }},
+    )
+    def test_failed_job_stays_in_queue(self):
+        '''Неудачное задание повторяется и остаётся в очереди'''
+        post = self.create_post()
+        # Воркер с --once разбирает очередь, пока в ней есть что делать.
+        call_command('thumbnail_worker', once=True, stdout=StringIO())
+        job = ThumbnailJob.objects.get(image=post.image.name)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNone(job.claimed)
+        self.assertEqual(thumbnails.process(), 0)
+
+    def test_worker_discards_broken_original(self):
+        '''Битый оригинал удаляется из хранилища и из поста'''
+        post = self.create_post()
+        path = post.image.path
+        with open(path, 'r+b') as file:
+            content = bytearray(file.read())
+            start = content.index(b'IDAT')
+            length = int.from_bytes(content[start - 4:start], 'big')
+            content[start + 4 + length] ^= 0xFF
+            file.seek(0)
+            file.write(content)
+        call_command('thumbnail_worker', once=True, stdout=StringIO())
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+        post.refresh_from_db()
+        self.assertFalse(post.image)
+
+    @override_settings(THUMBNAIL_PIPELINE_EAGER=True)
+    def test_responsive_variants(self):
+        '''Картинка отдаётся в WebP и JPEG всех ширин через srcset'''
+        post = self.create_post()
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        config = settings.THUMBNAIL_GEOMETRIES['feed']
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, 'width="960" height="339"')
+        for width in config['widths']:
+            with self.subTest(width=width):
+                self.assertContains(response, f'.webp {width}w')
+                self.assertContains(response, f'.jpg {width}w')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_PIPELINE_EAGER=False,
+)
+class BoundedImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @staticmethod
+    def image_file(size, name='big.png'):
+        image = BytesIO()
+        Image.new('RGB', size, 'red').save(image, 'PNG')
+        return SimpleUploadedFile(
+            name=name,
+            content=image.getvalue(),
+            content_type='image/png'
+        )
+
+    def test_validation_does_not_decode_image(self):
+        '''Форма проверяет картинку без декодирования пикселей'''
+        uploaded = self.image_file((6000, 6000))
+        form = PostForm(data={'text': 'test'}, files={'image': uploaded})
+        # Плагины Pillow импортируются при первом open(), не считаем их.
+        Image.init()
+        tracemalloc.start()
+        try:
+            self.assertTrue(form.is_valid())
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # Декодированная картинка заняла бы больше 100 МБ.
+        self.assertLess(peak, 256 * 1024)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=10 ** 6)
+    def test_pixel_limit(self):
+        '''Картинка с большим числом пикселей отклоняется'''
+        form = PostForm(
+            data={'text': 'test'},
+            files={'image': self.image_file((2000, 1000))},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'too_many_pixels')
+
+    @override_settings(
+        POST_IMAGE_MAX_BYTES=1024,
+        FILE_UPLOAD_MAX_MEMORY_SIZE=0,
+    )
+    def test_byte_limit_stops_writing_upload(self):
+        '''Слишком большой файл не сохраняется и отклоняется формой'''
+        image = BytesIO()
+        Image.effect_noise((200, 200), 50).save(image, 'PNG')
+        uploaded = SimpleUploadedFile('noise.png', image.getvalue())
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'test', 'image': uploaded},
+        )
+        self.assertFormError(
+            response, 'form', 'image', f'Файл больше {filesizeformat(1024)}.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_SIDE=500)
+    def test_worker_downscales_original(self):
+        '''Воркер уменьшает слишком большой оригинал'''
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'test', 'image': self.image_file((1500, 600))},
+        )
+        call_command('thumbnail_worker', once=True, stdout=StringIO())
+        post = Post.objects.get(text='test')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (500, 200))
+
+    def test_full_check_left_to_worker(self):
+        '''Файл целиком проверяет воркер, а не запрос'''
+        image = BytesIO()
+        Image.effect_noise((200, 200), 50).convert('RGB').save(image, 'JPEG')
+        # Обрезанный JPEG: заголовок цел, и verify() его пропускает,
+        # но пиксели не декодируются.
+        content = image.getvalue()[:len(image.getvalue()) // 2]
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'test',
+                'image': SimpleUploadedFile('broken.jpg', content),
+            },
+        )
+        post = Post.objects.get(text='test')
+        path = post.image.path
+        self.assertTrue(ThumbnailJob.objects.exists())
+        call_command('thumbnail_worker', once=True, stdout=StringIO())
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+        post.refresh_from_db()
+        self.assertFalse(post.image)
@@ -0,0 +1,231 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import AuthorStats, Comment, Follow, Group, Post, TimelineEntry
+from ..search import search_posts
+
+
+User = get_user_model()
+
+
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Bilbo')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as output:
+            output.write(content)
+        return path
+
+    def import_file(self, path, *args):
+        out = StringIO()
+        call_command('import_posts', path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_jsonl(self):
+        '''Импорт сохраняет даты и обновляет счётчики и ленты'''
+        rows = [
+            {'id': 100, 'text': 'Старый пост про дракона', 'author': 'Bilbo',
+             'group': 'slug', 'pub_date': '2015-05-01T10:00:00+00:00'},
+            {'text': 'Пост нового автора', 'author': 'Frodo',
+             'group': 'new-group', 'pub_date': '2016-01-01T00:00:00'},
+            {'type': 'comment', 'post': 100, 'author': 'Frodo',
+             'text': 'Комментарий', 'created': '2015-05-02T10:00:00Z'},
+            {'type': 'follow', 'user': 'Frodo', 'author': 'Bilbo'},
+        ]
+        path = self.write(
+            'posts.jsonl', '\n'.join(json.dumps(row) for row in rows)
+        )
+        output = self.import_file(path, '--batch-size', '1')
+        self.assertIn('строк в секунду', output)
+        post = Post.objects.get(pk=100)
+        date = datetime(2015, 5, 1, 10, tzinfo=timezone.utc)
+        self.assertEqual((post.pub_date, post.updated), (date, date))
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            Comment.objects.get().created,
+            datetime(2015, 5, 2, 10, tzinfo=timezone.utc),
+        )
+        frodo = User.objects.get(username='Frodo')
+        self.assertFalse(frodo.has_usable_password())
+        self.assertTrue(Group.objects.filter(slug='new-group').exists())
+        self.assertEqual(Group.objects.get(slug='slug').posts_count, 1)
+        self.assertEqual(AuthorStats.objects.get(user=frodo).posts_count, 1)
+        self.assertTrue(Follow.objects.filter(user=frodo).exists())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=frodo, post=post).exists()
+        )
+        self.assertEqual(list(search_posts('дракон')), [post])
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    @override_settings(TIMELINE_BACKFILL_SIZE=1)
+    def test_import_keeps_existing_timelines(self):
+        '''Импорт дополняет ленты, а не пересобирает их заново'''
+        reader = User.objects.create_user(username='Sam')
+        Follow.objects.create(user=reader, author=self.author)
+        old_posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(2)
+        ]
+        path = self.write(
+            'posts.jsonl', '{"text": "Новый пост", "author": "Bilbo"}\n'
+        )
+        self.import_file(path)
+        self.assertEqual(
+            set(reader.timeline.values_list('post_id', flat=True)),
+            {post.pk for post in old_posts}
+            | {Post.objects.get(text='Новый пост').pk},
+        )
+
+    def test_comment_on_existing_post_refreshes_page(self):
+        '''Комментарий к старому посту виден на закэшированной странице'''
+        post = Post.objects.create(author=self.author, text='Старый пост')
+        url = reverse('posts:post_detail', args=[post.pk])
+        Client().get(url)
+        path = self.write('comments.jsonl', json.dumps({
+            'type': 'comment', 'post': post.pk, 'author': 'Frodo',
+            'text': 'Импортированный комментарий',
+        }))
+        self.import_file(path)
+        self.assertContains(Client().get(url), 'Импортированный комментарий')
+
+    def test_import_csv(self):
+        '''CSV читается по заголовку'''
+        path = self.write(
+            'posts.csv',
+            'text,author,group\nПервый,Bilbo,slug\nВторой,Bilbo,\n',
+        )
+        self.import_file(path)
+        self.assertEqual(
+            set(Post.objects.values_list('text', 'group__slug')),
+            {('Первый', 'slug'), ('Второй', None)},
+        )
+
+    def test_bad_row_reports_line(self):
+        '''Ошибка в строке называет её номер, записанное остаётся'''
+        path = self.write(
+            'posts.jsonl',
+            '{"text": "Первый", "author": "Bilbo"}\n{"author": "Bilbo"}\n',
+        )
+        with self.assertRaisesMessage(CommandError, 'строка 2'):
+            self.import_file(path, '--batch-size', '1')
+        self.assertEqual(Post.objects.count(), 1)
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+
+
+class ExportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Bilbo')
+        cls.reader = User.objects.create_user(username='Frodo')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        for number in range(5):
+            post = Post.objects.create(
+                author=cls.author,
+                text=f'Пост {number}',
+                group=cls.group if number % 2 else None,
+            )
+        Comment.objects.create(post=post, author=cls.reader, text='Ура')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def export(self, name, *args):
+        path = os.path.join(self.directory, name)
+        call_command('export_posts', path, *args, stderr=StringIO())
+        return path
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('id').values_list(
+                'id', 'text', 'author__username', 'group__slug', 'pub_date'
+            )),
+            list(Comment.objects.values_list(
+                'post_id', 'author__username', 'text', 'created'
+            )),
+        )
+
+    def test_round_trip(self):
+        '''Выгрузка загружается обратно без потерь в любом формате'''
+        expected = self.snapshot()
+        for name in ('posts.jsonl', 'posts.csv.gz'):
+            with self.subTest(name=name):
+                path = self.export(name, '--batch-size', '2')
+                Post.objects.all().delete()
+                call_command('import_posts', path, stdout=StringIO())
+                self.assertEqual(self.snapshot(), expected)
+
+    def test_keyset_batches(self):
+        '''Выгрузка читает таблицы пачками, а не целиком'''
+        # Три пачки постов по два и одна пачка комментариев.
+        with self.assertNumQueries(4):
+            self.export('posts.jsonl', '--batch-size', '2')
+
+    def test_filters(self):
+        '''Выгрузку можно ограничить группой и датами'''
+        path = self.export('posts.csv.gz', '--group', 'slug')
+        with gzip.open(path, 'rt', encoding='utf-8') as exported:
+            text = exported.read()
+        self.assertIn('Пост 1', text)
+        self.assertNotIn('Пост 0', text)
+        path = self.export('posts.jsonl', '--since', '2000-01-01',
+                           '--until', '2000-01-02')
+        with open(path, encoding='utf-8') as exported:
+            self.assertEqual(exported.read(), '')
+
+    def test_admin_action_streams_selection(self):
+        '''Действие админки отдаёт выбранные посты потоком JSONL'''
+        admin = User.objects.create_superuser('admin', '', 'password')
+        client = Client()
+        client.force_login(admin)
+        post = Post.objects.latest('id')
+        response = client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'export_jsonl',
+            '_selected_action': [post.pk],
+        })
+        self.assertTrue(response.streaming)
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [(row['type'], row['text']) for row in rows],
+            [('post', post.text), ('comment', 'Ура')],
+        )
@@ -1,7 +1,12 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-from ..models import Group, Post
+from ..models import AuthorStats, Comment, Follow, Group, Post
 
 
 User = get_user_model()
@@ -40,3 +45,192 @@ class PostModelTest(TestCase):
         post = PostModelTest.post
         help_text = post._meta.get_field('text').help_text
         self.assertEqual(help_text, 'Введите текст поста')
+
+
+class FeedQuerySetTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(title='Группа', slug='feed')
+        for number in range(3):
+            Post.objects.create(
+                author=User.objects.create_user(
+                    username=f'author{number}', first_name='Автор'
+                ),
+                text=f'Пост {number}',
+                group=cls.group if number % 2 else None,
+            )
+
+    def test_feed_posts_read_in_one_query(self):
+        """Всё, что выводит лента, читается одним запросом."""
+        with self.assertNumQueries(1):
+            for post in Post.objects.for_feed():
+                (post.excerpt, post.excerpt_truncated, post.pub_date,
+                 post.image, post.pk,
+                 post.author.get_full_name(), post.author.username,
+                 post.group and post.group.slug)
+
+    def test_feed_skips_unused_columns(self):
+        """Лента не читает колонки, которые шаблоны не выводят."""
+        post = Post.objects.for_feed().first()
+        self.assertEqual(
+            post.get_deferred_fields(),
+            {'text', 'text_html', 'updated', 'comments_count'},
+        )
+        self.assertIn('password', post.author.get_deferred_fields())
+
+
+@override_settings(POST_EXCERPT_WORDS=5)
+class RenderedTextTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_text_rendered_on_save(self):
+        '''При сохранении поста рендерятся анонс и HTML текста.'''
+        post = Post.objects.create(
+            author=self.user,
+            text='Раз <b>два</b> три\nчетыре\n\nпять шесть семь',
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Раз <b>два</b> три четыре пять …')
+        self.assertTrue(post.excerpt_truncated)
+        self.assertEqual(
+            post.text_html,
+            '<p>Раз &lt;b&gt;два&lt;/b&gt; три<br>четыре</p>\n\n'
+            '<p>пять шесть семь</p>',
+        )
+        post.text = 'Короткий пост'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Короткий пост')
+        self.assertFalse(post.excerpt_truncated)
+
+    def test_feed_shows_excerpt_with_read_more(self):
+        '''Лента выводит анонс и ссылку на длинный пост.'''
+        post = Post.objects.create(
+            author=self.user, text='один два три четыре пять шесть семь'
+        )
+        short = Post.objects.create(author=self.user, text='Короткий пост')
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'шесть семь')
+        self.assertContains(
+            response,
+            f'<a href="{reverse("posts:post_detail", args=[post.pk])}">'
+            'Читать дальше</a>',
+            html=True,
+        )
+        self.assertNotContains(
+            response, reverse('posts:post_detail', args=[short.pk])
+        )
+
+    def test_render_posts_fills_stale_rows(self):
+        '''render_posts заново рендерит посты, записанные без сигналов,
+        и сдвигает их updated.'''
+        post = Post.objects.create(author=self.user, text='Текст поста')
+        fresh = Post.objects.create(author=self.user, text='Другой пост')
+        Post.objects.filter(pk=post.pk).update(excerpt='', text_html='')
+        call_command('render_posts', batch_size=1, stdout=StringIO())
+        stale_updated = post.updated
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Текст поста')
+        self.assertEqual(post.text_html, '<p>Текст поста</p>')
+        self.assertGreater(post.updated, stale_updated)
+        self.assertEqual(
+            Post.objects.get(pk=fresh.pk).updated, fresh.updated
+        )
+
+
+class CountersTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Bilbo')
+        cls.user = User.objects.create_user(username='Frodo')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.group_test = Group.objects.create(
+            title='Тестовая группа 2',
+            slug='slug-test',
+            description='Тестовое описание 2',
+        )
+
+    def assert_counters(self, posts_count, group_posts_count):
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count,
+            posts_count
+        )
+        self.assertEqual(
+            Group.objects.get(pk=self.group.pk).posts_count,
+            group_posts_count
+        )
+
+    def test_post_counters(self):
+        """Счётчики постов меняются при создании, смене группы
+        и удалении поста."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Тестовый текст',
+            group=self.group,
+        )
+        self.assert_counters(1, 1)
+        post.group = self.group_test
+        post.save()
+        self.assert_counters(1, 0)
+        self.assertEqual(
+            Group.objects.get(pk=self.group_test.pk).posts_count, 1
+        )
+        post.delete()
+        self.assert_counters(0, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Счётчики комментариев и подписок меняются вместе с записями."""
+        post = Post.objects.create(author=self.author, text='Тестовый текст')
+        comment = Comment.objects.create(
+            post=post,
+            author=self.user,
+            text='Тестовый комментарий',
+        )
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 1)
+        comment.delete()
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 0)
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).followers_count, 1
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).following_count, 1
+        )
+        follow.delete()
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).followers_count, 0
+        )
+
+    def test_reconcile_counters(self):
+        """reconcile_counters исправляет расхождения счётчиков."""
+        Post.objects.create(
+            author=self.author,
+            text='Тестовый текст',
+            group=self.group,
+        )
+        AuthorStats.objects.filter(user=self.author).update(posts_count=7)
+        Group.objects.filter(pk=self.group.pk).update(posts_count=0)
+        AuthorStats.objects.filter(user=self.user).delete()
+        post = Post.objects.create(author=self.author, text='Второй пост')
+        Post.objects.filter(pk=post.pk).update(comments_count=3)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assert_counters(2, 1)
+        fixed = Post.objects.get(pk=post.pk)
+        self.assertEqual(fixed.comments_count, 0)
+        self.assertGreater(fixed.updated, post.updated)
+        self.assertTrue(AuthorStats.objects.filter(user=self.user).exists())
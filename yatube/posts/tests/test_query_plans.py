@@ -0,0 +1,99 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?posts_\w+(?! USING)\s*$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+class FeedQueryPlanTests(TestCase):
+    POST_COUNT = 15
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Bilbo')
+        cls.user = User.objects.create_user(username='Frodo')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for _ in range(cls.POST_COUNT):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text='Тестовый текст',
+                group=cls.group,
+            )
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='Тестовый комментарий',
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=[cls.post.pk]),
+        )
+
+    def setUp(self):
+        # Из кэша фрагментов лента не читает постов, и их запросы
+        # не попали бы в проверку.
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_feed_queries_use_indexes(self):
+        for url in self.urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_client.get(url)
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'posts_' not in sql:
+                    continue
+                for step in self.explain(sql):
+                    with self.subTest(url=url, sql=sql, step=step):
+                        self.assertNotIn(TEMP_SORT, step)
+                        self.assertIsNone(FULL_SCAN.search(step))
+
+    def test_offset_feeds_use_indexes(self):
+        '''Запросы лент читают данные по индексам без сортировки'''
+        self.assert_feed_queries_use_indexes()
+
+    def test_cursor_feeds_use_indexes(self):
+        '''Запросы лент по курсорам читают данные по индексам'''
+        cursor_modes = {
+            'index': 'cursor',
+            'group_list': 'cursor',
+            'profile': 'cursor',
+            'follow_index': 'cursor',
+        }
+        with override_settings(PAGINATION_MODES=cursor_modes):
+            self.assert_feed_queries_use_indexes()
+            page = self.authorized_client.get(
+                reverse('posts:follow_index')
+            ).context['page_obj']
+            next_page = self.authorized_client.get(
+                reverse('posts:follow_index'), {'after': page.next_cursor}
+            ).context['page_obj']
+        self.assertEqual(
+            len(page) + len(next_page),
+            self.POST_COUNT,
+        )
@@ -0,0 +1,133 @@
+from io import StringIO
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Post
+from ..search import FTS_TABLE, search_posts
+
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.hobbit = Post.objects.create(
+            author=cls.user,
+            text='Хоббит Бильбо ушёл из Шира',
+        )
+        cls.dragon = Post.objects.create(
+            author=cls.user,
+            text='Дракон, дракон и ещё раз дракон. Хоббит тоже есть',
+        )
+        cls.other = Post.objects.create(
+            author=cls.user,
+            text='Совсем другой текст',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_search_ranks_results(self):
+        '''Поиск находит посты по словам и префиксам по релевантности'''
+        self.assertEqual(list(search_posts('дракон')), [self.dragon])
+        self.assertEqual(
+            set(search_posts('хоббит')), {self.hobbit, self.dragon}
+        )
+        self.assertEqual(list(search_posts('бильб шир')), [self.hobbit])
+        self.assertEqual(list(search_posts('ушел')), [self.hobbit])
+
+    def test_query_syntax_is_escaped(self):
+        '''Операторы FTS5 во вводе пользователя не ломают поиск'''
+        for query in ('"дракон', 'text:дракон', 'NEAR(', '*', 'AND OR'):
+            with self.subTest(query=query):
+                list(search_posts(query))
+
+    def test_index_follows_post_changes(self):
+        '''Индекс обновляется при изменении и удалении поста'''
+        self.other.text = 'Теперь про эльфов'
+        self.other.save()
+        self.assertEqual(list(search_posts('эльфов')), [self.other])
+        self.assertFalse(search_posts('другой').exists())
+        self.other.delete()
+        self.assertFalse(search_posts('эльфов').exists())
+
+    def test_search_page_keeps_query_in_paginator(self):
+        '''Страница поиска разбита на страницы и помнит запрос'''
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Хоббит номер {number}')
+            for number in range(12)
+        )
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'хоббит'}
+        )
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+        self.assertContains(
+            response, '?' + urlencode({'q': 'хоббит'}) + '&page=2'
+        )
+
+    def test_rebuild_command(self):
+        '''Команда перестраивает индекс пачками'''
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"
+            )
+        self.assertFalse(search_posts('дракон').exists())
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=out)
+        self.assertIn('3', out.getvalue())
+        self.assertEqual(list(search_posts('дракон')), [self.dragon])
+
+    def test_rebuild_keeps_writes_between_batches(self):
+        '''Правки постов во время перестройки попадают в новый индекс'''
+        hobbit, dragon, other = Post.objects.order_by('pk')
+        search.start_rebuild()
+        with connection.cursor() as cursor:
+            search.copy_batch(cursor, 1)
+        hobbit.text = 'Хоббит вернулся домой'
+        hobbit.save()
+        dragon.delete()
+        other.text = 'Теперь про эльфов'
+        other.save()
+        wizard = Post.objects.create(author=self.user, text='Гэндальф')
+        search.finish_rebuild()
+        self.assertEqual(list(search_posts('вернулся')), [hobbit])
+        self.assertFalse(search_posts('бильбо').exists())
+        self.assertFalse(search_posts('дракон').exists())
+        self.assertEqual(list(search_posts('эльфов')), [other])
+        self.assertFalse(search_posts('другой').exists())
+        self.assertEqual(list(search_posts('гэндальф')), [wizard])
+        # Триггеры индекса после подмены пишут в новую таблицу.
+        wizard.text = 'Саруман'
+        wizard.save()
+        self.assertEqual(list(search_posts('саруман')), [wizard])
+        self.assertFalse(search_posts('гэндальф').exists())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name LIKE '%%_new%%' "
+                "OR name LIKE '%%progress%%'"
+            )
+            self.assertEqual(cursor.fetchall(), [])
+
+    def test_admin_search_uses_index(self):
+        '''Поиск в админке идёт через полнотекстовый индекс'''
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'дракон'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.dragon]
+        )
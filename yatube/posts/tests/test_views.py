@@ -8,8 +8,12 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from ..models import Group, Follow, Post
+from core.queries import QueryRecorder
+
+from ..models import Comment, Group, Follow, Post, TimelineEntry
 
 
 User = get_user_model()
@@ -164,17 +168,116 @@ class PostPagesTests(TestCase):
                         len(response.context['page_obj'].object_list), count
                     )
 
+    def test_cursor_paginator(self):
+        '''Проверяем постраничный вывод по курсорам'''
+        posts = [
+            Post(author=self.user, text='Тестовый текст', group=self.group)
+            for _ in range(self.POST_COUNT)
+        ]
+        Post.objects.bulk_create(posts)
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'pk', flat=True
+            )
+        )
+        cursor_modes = {
+            'index': 'cursor',
+            'group_list': 'cursor',
+            'profile': 'cursor',
+        }
+        with override_settings(PAGINATION_MODES=cursor_modes):
+            for url, _ in self.paginator_urls:
+                with self.subTest(url=url):
+                    cache.clear()
+                    first = self.client.get(url).context['page_obj']
+                    self.assertFalse(first.has_previous())
+                    second = self.client.get(
+                        url, {'after': first.next_cursor}
+                    ).context['page_obj']
+                    self.assertFalse(second.has_next())
+                    self.assertEqual(
+                        [post.pk for post in first]
+                        + [post.pk for post in second],
+                        expected,
+                    )
+                    back = self.client.get(
+                        url, {'before': second.previous_cursor}
+                    ).context['page_obj']
+                    self.assertEqual(
+                        [post.pk for post in back],
+                        [post.pk for post in first],
+                    )
+                    broken = self.client.get(url, {'after': 'broken'})
+                    self.assertEqual(
+                        len(broken.context['page_obj']),
+                        self.PAGE_ONE_POST_COUNT,
+                    )
+
     def test_index_page_cache(self):
         '''Проверяем, что записи на главной странице
         хранятся в cache'''
         cache.clear()
         response = self.authorized_client.get(reverse('posts:index'))
         response_cache = response.content
-        post = Post.objects.get(pk=1)
-        post.delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(response_cache, response.content)
 
+    def test_feed_cache_invalidated_on_change(self):
+        '''Изменение и удаление поста сразу сбрасывают кэш лент'''
+        for url, _ in self.paginator_urls:
+            with self.subTest(url=url):
+                cache.clear()
+                post = Post.objects.create(
+                    author=self.user,
+                    text='Пост для кэша',
+                    group=self.group,
+                )
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Пост для кэша')
+                post.text = 'Исправленный пост'
+                post.save()
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Исправленный пост')
+                post.delete()
+                response = self.authorized_client.get(url)
+                self.assertNotContains(response, 'Исправленный пост')
+
+    def test_feed_cache_varies_by_page_and_user(self):
+        '''Страницы и варианты для гостя и пользователя
+        кэшируются отдельно'''
+        cache.clear()
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {number}', group=self.group)
+            for number in range(self.POST_COUNT)
+        )
+        first = self.guest_client.get(reverse('posts:index'))
+        second = self.guest_client.get(reverse('posts:index'), {'page': 2})
+        self.assertNotEqual(first.content, second.content)
+        authorized = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(authorized, 'Избранные авторы')
+        self.assertNotContains(first, 'Избранные авторы')
+
+    def test_feed_cache_key_uses_resolved_page(self):
+        '''Ключ кэша строится по выбранной странице, а не по параметрам'''
+        cache.clear()
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {number}', group=self.group)
+            for number in range(self.POST_COUNT)
+        )
+        for url, _ in self.paginator_urls:
+            with self.subTest(url=url):
+                keys = {
+                    self.guest_client.get(url, params).context[
+                        'feed_cache'
+                    ]['key']
+                    for params in (
+                        {}, {'page': 1}, {'page': 'junk'}, {'page': '01'},
+                        {'after': 'broken'}, {'before': 'broken'},
+                    )
+                }
+                self.assertEqual(len(keys), 1)
+
 
 class FollowPagesTest(TestCase):
     NAME_AUTHOR = 'Bilbo'
@@ -258,3 +361,182 @@ class FollowPagesTest(TestCase):
             author=self.author,
         ).exists()
         self.assertFalse(unfollow)
+
+    def test_follow_backfills_and_unfollow_trims_timeline(self):
+        '''Подписка добавляет в ленту старые посты автора,
+        отписка их убирает'''
+        post = Post.objects.create(
+            author=self.author,
+            text='Тестовый текст публикации',
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.author])
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.author])
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertNotIn(post, response.context['page_obj'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_hybrid_author_posts_read_on_demand(self):
+        '''Посты автора с большим числом подписчиков
+        не раскладываются, но попадают в ленту'''
+        cache.clear()
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(
+            author=self.author,
+            text='Тестовый текст публикации',
+        )
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_below_limit_again_fanned_out(self):
+        '''Когда подписчиков снова не больше лимита, пропущенные
+        посты раскладываются по лентам'''
+        cache.clear()
+        other = User.objects.create_user(username='Sam')
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        post = Post.objects.create(
+            author=self.author,
+            text='Тестовый текст публикации',
+        )
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        Follow.objects.filter(user=other).delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+
+@override_settings(COMMENTS_ON_PAGE=20)
+class CommentsPaginationTests(TestCase):
+    COMMENT_COUNT = 25
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый текст',
+        )
+        for number in range(cls.COMMENT_COUNT):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'user{number}'),
+                text=f'Комментарий {number}',
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comments_loaded_with_authors_page_by_page(self):
+        '''Комментарии выводятся порциями одним запросом с авторами'''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:post_detail', args=[self.post.pk])
+            )
+        comment_queries = [
+            query for query in queries.captured_queries
+            if 'FROM "posts_comment"' in query['sql']
+        ]
+        self.assertEqual(len(comment_queries), 1)
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            [f'Комментарий {number}' for number in range(20)],
+        )
+        self.assertTrue(comments.has_next())
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk]),
+            {'after': comments.next_cursor},
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            [f'Комментарий {number}' for number in range(20, 25)],
+        )
+        self.assertNotContains(response, 'Показать ещё')
+
+
+class PostDetailCacheTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый текст',
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Первый комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def comment_queries(self, client):
+        with QueryRecorder() as recorder:
+            response = client.get(self.url)
+        return response, [
+            sql for sql, _ in recorder.queries if 'FROM "posts_comment"' in sql
+        ]
+
+    def test_cached_page_skips_comments_query(self):
+        '''Повторный просмотр поста не читает комментарии.'''
+        _, queries = self.comment_queries(self.client)
+        self.assertEqual(len(queries), 1)
+        response, queries = self.comment_queries(self.client)
+        self.assertEqual(queries, [])
+        self.assertContains(response, 'Первый комментарий')
+        self.assertContains(response, 'Тестовый текст')
+
+    def test_new_comment_and_edit_shown(self):
+        '''Новый комментарий и правка поста сразу видны на странице.'''
+        self.client.get(self.url)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Второй комментарий'
+        )
+        self.assertContains(self.client.get(self.url), 'Второй комментарий')
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный текст'
+        post.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Исправленный текст')
+        self.assertNotContains(response, 'Тестовый текст')
+
+    def test_comment_edit_shown(self):
+        '''Правка комментария сбрасывает кэш страницы поста.'''
+        self.client.get(self.url)
+        comment = Comment.objects.get(post=self.post)
+        comment.text = 'Исправленный комментарий'
+        comment.save()
+        self.assertContains(
+            self.client.get(self.url), 'Исправленный комментарий'
+        )
+
+    def test_shared_fragments_keep_user_parts(self):
+        '''Гость и автор делят фрагменты, но ссылка и форма — свои.'''
+        guest = self.client.get(self.url)
+        self.assertNotContains(guest, 'Редактировать пост')
+        self.assertNotContains(guest, 'Добавить комментарий')
+        response, queries = self.comment_queries(self.author_client)
+        self.assertEqual(queries, [])
+        self.assertContains(response, 'Редактировать пост')
+        self.assertContains(response, 'Добавить комментарий')
@@ -0,0 +1,251 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+post_create и post_edit ставят загруженную картинку в очередь
+ThumbnailJob, а `manage.py thumbnail_worker` строит миниатюры всех
+размеров, ширин и форматов из settings.THUMBNAIL_GEOMETRIES.
+Шаблоны только читают готовые миниатюры из хранилища sorl и
+показывают заглушку, пока миниатюры нет, поэтому ленты не
+декодируют картинки в запросе.
+
+Перед миниатюрами воркер декодирует оригинал целиком и уменьшает его
+до POST_IMAGE_MAX_SIDE: форма пиксели не декодирует.
+Битый оригинал удаляется из хранилища и из постов. Задание уходит из
+очереди только после успеха; неудачное повторяется, пока не наберёт
+THUMBNAIL_JOB_ATTEMPTS попыток, и затем остаётся в очереди для разбора.
+
+При settings.THUMBNAIL_PIPELINE_EAGER миниатюры строятся сразу,
+без очереди, — так удобнее при разработке и в тестах.
+
+Pillow и бэкенд sorl импортируются при первой работе с картинкой,
+а не при загрузке модуля: модуль импортируют админка и вьюхи, и иначе
+Pillow загружал бы каждый процесс, включая команды без картинок.
+"""
+import functools
+import logging
+import os
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from sorl.thumbnail import default
+
+from .feed_cache import bump_feed_generation
+from .models import Post, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {
+    'GIF': 'image/gif',
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+}
+
+
+class BrokenImage(Exception):
+    """Оригинал картинки не прошёл полную проверку."""
+
+
+@functools.lru_cache(maxsize=None)
+def get_backend():
+    '''Бэкенд sorl; sorl и Pillow загружаются при первом обращении.'''
+    from .sorl_backend import PipelineBackend
+    return PipelineBackend()
+
+
+def variants(geometry_name):
+    '''Ширины и форматы миниатюр размера из THUMBNAIL_GEOMETRIES.
+
+    Выдаёт (формат, ширина, высота, геометрия sorl, опции); высота
+    считается по пропорциям основного размера.
+    '''
+    config = settings.THUMBNAIL_GEOMETRIES[geometry_name]
+    width, height = config['size']
+    for variant_width in config['widths']:
+        variant_height = round(height * variant_width / width)
+        for format_ in config['formats']:
+            yield (
+                format_,
+                variant_width,
+                variant_height,
+                f'{variant_width}x{variant_height}',
+                {**config['options'], 'format': format_},
+            )
+
+
+def prepare(name):
+    '''Полностью проверяет оригинал и уменьшает слишком большой.
+
+    Форма не декодирует пиксели, а импорт не проверяет картинки вовсе,
+    поэтому декодирование происходит здесь, вне запроса: оно находит
+    и обрезанные файлы, которые verify() пропускает. Анимации
+    не уменьшаются, чтобы не потерять кадры.
+    '''
+    from PIL import Image
+
+    with default_storage.open(name) as file:
+        try:
+            with Image.open(file) as image:
+                image.verify()
+            file.seek(0)
+            image = Image.open(file)
+            image.load()
+        except Exception as error:
+            raise BrokenImage(name) from error
+        with image:
+            side = settings.POST_IMAGE_MAX_SIDE
+            if (max(image.size) <= side
+                    or getattr(image, 'is_animated', False)):
+                return
+            format_ = image.format
+            image.thumbnail((side, side))
+            content = BytesIO()
+            image.save(content, format_)
+    # Уменьшенная копия пишется рядом и подменяет оригинал одним
+    # переименованием: читатели не застанут файл удалённым или
+    # недописанным. Картинки постов лежат в локальном хранилище.
+    temp = default_storage.save(
+        f'{name}.part', ContentFile(content.getvalue())
+    )
+    os.replace(default_storage.path(temp), default_storage.path(name))
+
+
+def discard(name):
+    '''Удаляет битый оригинал из хранилища и из постов.'''
+    default_storage.delete(name)
+    Post.objects.filter(image=name).update(image='', updated=timezone.now())
+
+
+def generate(name):
+    '''Строит миниатюры всех размеров, возвращает успех.'''
+    if not default.storage.exists(name):
+        return False
+    try:
+        prepare(name)
+        backend = get_backend()
+        for geometry_name in settings.THUMBNAIL_GEOMETRIES:
+            for _, _, _, geometry, options in variants(geometry_name):
+                backend.get_thumbnail(name, geometry, **options)
+    except BrokenImage:
+        logger.warning('Картинка %s повреждена и удалена', name)
+        discard(name)
+        return False
+    except Exception:
+        logger.exception('Не удалось построить миниатюры для %s', name)
+        return False
+    return True
+
+
+def enqueue(image):
+    '''Ставит картинку в очередь после фиксации транзакции.'''
+    if not image:
+        return
+    name = image.name
+    if settings.THUMBNAIL_PIPELINE_EAGER:
+        transaction.on_commit(lambda: generate(name))
+        return
+    try:
+        with transaction.atomic():
+            ThumbnailJob.objects.create(image=name)
+    except IntegrityError:
+        pass
+
+
+def process(limit=None):
+    '''Обрабатывает задания очереди, возвращает число обработанных.
+
+    Задание забирается отметкой claimed, поэтому несколько воркеров
+    не строят одну картинку дважды, а задание упавшего воркера снова
+    становится свободным через THUMBNAIL_JOB_TIMEOUT. Готовые миниатюры
+    сбрасывают кэш лент и страниц постов, иначе в нём останутся заглушки.
+    '''
+    jobs = ThumbnailJob.objects.filter(
+        attempts__lt=settings.THUMBNAIL_JOB_ATTEMPTS
+    ).order_by('created')
+    if limit is not None:
+        jobs = jobs[:limit]
+    processed = []
+    for pk, name in list(jobs.values_list('pk', 'image')):
+        if not claim(pk):
+            continue
+        job = ThumbnailJob.objects.filter(pk=pk)
+        if generate(name) or not default_storage.exists(name):
+            # Готово, или пробовать больше нечего: файла нет.
+            job.delete()
+        else:
+            job.update(attempts=F('attempts') + 1, claimed=None)
+        processed.append(name)
+    if processed:
+        # Страницы постов с этими картинками изменились: сдвигаем
+        # их updated, по нему проверяются ETag и кэш фрагментов.
+        Post.objects.filter(image__in=processed).update(
+            updated=timezone.now()
+        )
+        bump_feed_generation()
+    return len(processed)
+
+
+def claim(pk):
+    '''Отмечает задание взятым, если его не держит другой воркер.'''
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.THUMBNAIL_JOB_TIMEOUT)
+    return bool(
+        ThumbnailJob.objects.filter(pk=pk)
+        .filter(Q(claimed__isnull=True) | Q(claimed__lt=stale))
+        .update(claimed=now)
+    )
+
+
+def thumbnail_variant(image, geometry, options):
+    '''Готовая миниатюра или None, если она ещё не построена.'''
+    backend = get_backend()
+    thumbnail = backend.get_cached_thumbnail(image, geometry, **options)
+    if thumbnail is None and settings.THUMBNAIL_PIPELINE_EAGER:
+        # Как и тег {% thumbnail %}, битая картинка не роняет страницу.
+        try:
+            return backend.get_thumbnail(image, geometry, **options)
+        except Exception:
+            logger.exception('Не удалось построить миниатюру для %s', image)
+    return thumbnail
+
+
+def responsive_image(image, geometry_name):
+    '''Данные для <picture> со srcset по всем вариантам миниатюры.
+
+    Последний формат из настроек идёт в <img>, остальные — в <source>.
+    Пока построены не все варианты, возвращает None.
+    '''
+    if not image:
+        return None
+    config = settings.THUMBNAIL_GEOMETRIES[geometry_name]
+    srcsets = {format_: [] for format_ in config['formats']}
+    for format_, width, _, geometry, options in variants(geometry_name):
+        thumbnail = thumbnail_variant(image, geometry, options)
+        if thumbnail is None:
+            return None
+        srcsets[format_].append((thumbnail.url, width))
+    fallback = config['formats'][-1]
+    width, height = config['size']
+    return {
+        'sources': [
+            {
+                'type': MIME_TYPES[format_],
+                'srcset': srcset(srcsets[format_]),
+            }
+            for format_ in config['formats'][:-1]
+        ],
+        'src': srcsets[fallback][-1][0],
+        'srcset': srcset(srcsets[fallback]),
+        'sizes': config['sizes'],
+        'width': width,
+        'height': height,
+    }
+
+
+def srcset(candidates):
+    return ', '.join(f'{url} {width}w' for url, width in candidates)
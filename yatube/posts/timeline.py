@@ -0,0 +1,178 @@
+"""Материализованные ленты подписок (fan-out-on-write).
+
+Новый пост сразу раскладывается в TimelineEntry всех подписчиков
+автора, поэтому лента подписок читается одним диапазоном по индексу
+(user, pub_date, post). Посты авторов, у которых подписчиков больше
+settings.TIMELINE_FANOUT_LIMIT, не раскладываются, а подмешиваются
+при чтении (fan-out-on-read). Когда после отписок подписчиков снова
+не больше лимита, последние пропущенные посты автора раскладываются
+по лентам оставшихся подписчиков: иначе они пропали бы из лент.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FilteredRelation, Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+
+
+def is_hybrid_author(author_id):
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def fan_out_post(post):
+    '''Раскладывает новый пост по лентам подписчиков автора.'''
+    if is_hybrid_author(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in follower_ids
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_posts(posts):
+    '''Раскладывает пачку постов (queryset) по лентам подписчиков.
+
+    То же, что fan_out_post для каждого поста, но подписчики читаются
+    одним запросом на всю пачку.
+    '''
+    posts = list(posts.values_list('pk', 'author_id', 'pub_date'))
+    author_ids = {author_id for _, author_id, _ in posts}
+    hybrid_ids = set(AuthorStats.objects.filter(
+        user_id__in=author_ids,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('user_id', flat=True))
+    followers = defaultdict(list)
+    for user_id, author_id in Follow.objects.filter(
+        author_id__in=author_ids - hybrid_ids
+    ).values_list('user_id', 'author_id'):
+        followers[author_id].append(user_id)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, author_id, pub_date in posts
+            for user_id in followers[author_id]
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    '''Добавляет в ленту последние посты автора после подписки.'''
+    if is_hybrid_author(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL_SIZE]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def trim(user_id, author_id):
+    '''Убирает из ленты посты автора после отписки.'''
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def leave_hybrid(author_id):
+    '''Раскладывает пропущенные посты автора, если подписчиков стало
+    ровно лимит.
+
+    Вызывается после отписки: счётчик уменьшается на один, поэтому
+    равенство лимиту значит, что автор только что перестал быть
+    «гибридным» и его посты больше не подмешиваются при чтении.
+    Раскладываются только последние TIMELINE_REFILL_SIZE постов, которых
+    нет ни в одной ленте, — одним INSERT ... SELECT, без моделей
+    в памяти, поэтому отписка остаётся быстрой.
+    '''
+    if not AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '''
+            INSERT OR IGNORE INTO posts_timelineentry
+                (user_id, post_id, author_id, pub_date)
+            SELECT follow.user_id, post.id, post.author_id, post.pub_date
+            FROM (
+                SELECT id, author_id, pub_date FROM posts_post
+                WHERE author_id = %s AND NOT EXISTS (
+                    SELECT 1 FROM posts_timelineentry
+                    WHERE post_id = posts_post.id
+                )
+                ORDER BY pub_date DESC, id DESC
+                LIMIT %s
+            ) AS post
+            JOIN posts_follow AS follow ON follow.author_id = post.author_id
+            ''',
+            [author_id, settings.TIMELINE_REFILL_SIZE],
+        )
+
+
+def rebuild():
+    '''Пересобирает ленты всех пользователей заново.'''
+    TimelineEntry.objects.all().delete()
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    for user_id, author_id in follows.iterator():
+        backfill(user_id, author_id)
+
+
+def timeline_posts(user):
+    '''Посты ленты подписок пользователя.'''
+    hybrid_ids = list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('author_id', flat=True)
+    )
+    if not hybrid_ids:
+        # Порядок задаётся копиями pub_date и id в TimelineEntry, чтобы
+        # лента читалась диапазоном индекса (user, pub_date, post).
+        return Post.objects.annotate(
+            entry=FilteredRelation(
+                'timeline_entries',
+                condition=Q(timeline_entries__user=user),
+            )
+        ).filter(
+            entry__isnull=False
+        ).order_by(F('entry__pub_date').desc(), F('entry__post_id').desc())
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=hybrid_ids)
+    )
@@ -0,0 +1,48 @@
+"""Приём картинок постов с ограниченной памятью.
+
+Файлы больше FILE_UPLOAD_MAX_MEMORY_SIZE пишутся во временный файл,
+а BoundedUploadHandler перестаёт писать его после
+POST_IMAGE_MAX_BYTES, сохраняя настоящий размер. PostForm отклоняет
+файл по размеру и по числу пикселей из заголовка. ImageField формы
+только открывает картинку и вызывает verify(), не декодируя пиксели;
+декодирование и уменьшение выполняются в конвейере миниатюр
+(posts.thumbnails.prepare).
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+    '''Временный файл, в который не пишется больше лимита.'''
+
+    def receive_data_chunk(self, raw_data, start):
+        # Остаток всё равно вычитывается из запроса, но на диск
+        # не попадает: file_complete() запишет полный размер,
+        # и форма отклонит файл.
+        if start + len(raw_data) <= settings.POST_IMAGE_MAX_BYTES:
+            self.file.write(raw_data)
+
+
+def check_image_size(upload):
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)s.',
+            code='too_large',
+            params={'limit': filesizeformat(settings.POST_IMAGE_MAX_BYTES)},
+        )
+
+
+def check_image_pixels(image):
+    '''Проверяет число пикселей по заголовку картинки.
+
+    ImageField уже открыл картинку, и размеры известны из заголовка.
+    '''
+    width, height = image.image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка больше %(limit)s мегапикселей.',
+            code='too_many_pixels',
+            params={'limit': settings.POST_IMAGE_MAX_PIXELS // 10 ** 6},
+        )
@@ -1,10 +1,186 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
 
-from yatube import settings
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from django.utils.dateparse import parse_datetime
+
+
+def row_key(row, date_field):
+    '''Ключ курсора (дата, id) модели или строки values().'''
+    if isinstance(row, dict):
+        return row[date_field], row['id']
+    return getattr(row, date_field), row.pk
+
+
+class CursorPage(Page):
+    '''Страница ленты, адресуемая курсором, а не номером.
+
+    position — курсор, по которому страница на самом деле выбрана,
+    в каноническом виде: 'after=…', 'before=…' или '' для первой.
+    '''
+    is_cursor = True
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None, position=''):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.position = position
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator(Paginator):
+    '''Постраничный вывод по ключу (pub_date, id).
+
+    Вместо COUNT(*) и LIMIT/OFFSET выбирает per_page + 1 записей
+    после (или до) переданного курсора, поэтому любая страница
+    стоит столько же, сколько первая, и не сдвигается
+    при появлении новых постов.
+    '''
+    is_cursor = True
+
+    @staticmethod
+    def encode_key(date, pk):
+        raw = f'{date.isoformat()}|{pk}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @classmethod
+    def encode_cursor(cls, post):
+        return cls.encode_key(*row_key(post, 'pub_date'))
+
+    @staticmethod
+    def decode_cursor(cursor):
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            pub_date, pk = raw.decode().split('|')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+        if pub_date is None:
+            return None
+        return pub_date, pk
+
+    def get_cursor_page(self, after=None, before=None):
+        before_key = self.decode_cursor(before)
+        if before_key is not None:
+            page = self._page_before(before_key)
+            if page.object_list:
+                return page
+        return self._page_after(self.decode_cursor(after))
+
+    def _keys(self):
+        '''Поля ключа: явный порядок выборки или (pub_date, id).
+
+        Явный порядок должен сортировать по копиям pub_date и id поста,
+        например по полям TimelineEntry в ленте подписок.
+        '''
+        ordering = self.object_list.query.order_by or ('-pub_date', '-id')
+        return [
+            field.expression.name if isinstance(field, OrderBy)
+            else field.lstrip('-')
+            for field in ordering
+        ]
+
+    def _page_after(self, key):
+        date_field, id_field = self._keys()
+        posts = self.object_list
+        if key is not None:
+            pub_date, pk = key
+            posts = posts.filter(
+                Q(**{f'{date_field}__lt': pub_date})
+                | Q(**{date_field: pub_date, f'{id_field}__lt': pk})
+            )
+        rows = list(
+            posts.order_by(F(date_field).desc(), F(id_field).desc())[
+                :self.per_page + 1
+            ]
+        )
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows,
+            self,
+            next_cursor=self.encode_cursor(rows[-1]) if has_more else None,
+            previous_cursor=(
+                self.encode_cursor(rows[0]) if key and rows else None
+            ),
+            position=f'after={self.encode_key(*key)}' if key else '',
+        )
+
+    def _page_before(self, key):
+        date_field, id_field = self._keys()
+        pub_date, pk = key
+        posts = self.object_list.filter(
+            Q(**{f'{date_field}__gt': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__gt': pk})
+        )
+        rows = list(
+            posts.order_by(F(date_field).asc(), F(id_field).asc())[
+                :self.per_page + 1
+            ]
+        )
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return CursorPage(
+            rows,
+            self,
+            next_cursor=self.encode_cursor(rows[-1]) if rows else None,
+            previous_cursor=self.encode_cursor(rows[0]) if has_more else None,
+            position=f'before={self.encode_key(*key)}',
+        )
 
 
 def posts_per_page(request, post_list):
+    '''Разбивает ленту на страницы способом,
+    выбранным для вьюхи в settings.PAGINATION_MODES.'''
+    view_name = getattr(request.resolver_match, 'url_name', None)
+    if settings.PAGINATION_MODES.get(view_name) == 'cursor':
+        paginator = CursorPaginator(post_list, settings.POSTS_0N_PAGE)
+        return paginator.get_cursor_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
     paginator = Paginator(post_list, settings.POSTS_0N_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def comments_page(comments, after=None):
+    '''Следующие COMMENTS_ON_PAGE комментариев после курсора.
+
+    Комментарии идут от старых к новым по индексу (post, created),
+    курсор кодирует (created, id) последнего показанного.
+    '''
+    key = CursorPaginator.decode_cursor(after)
+    if key is not None:
+        created, pk = key
+        comments = comments.filter(
+            Q(created__gt=created) | Q(created=created, pk__gt=pk)
+        )
+    per_page = settings.COMMENTS_ON_PAGE
+    rows = list(comments.order_by('created', 'pk')[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    return CursorPage(
+        rows,
+        None,
+        next_cursor=(
+            CursorPaginator.encode_key(*row_key(rows[-1], 'created'))
+            if has_more else None
+        ),
+    )
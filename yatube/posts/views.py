@@ -1,67 +1,117 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.functional import SimpleLazyObject
 
+from .conditional import (conditional_page, feed_etag, post_etag,
+                          profile_etag)
+from .counters import author_stats
+from .feed_cache import feed_cache, post_cache
 from .forms import CommentForm, PostForm
-from .models import Group, Follow, Post, User, Comment
-from .utils import posts_per_page
+from .models import Group, Follow, Post, User
+from .search import search_posts
+from .thumbnails import enqueue
+from .timeline import timeline_posts
+from .utils import comments_page, posts_per_page
 
 
+@conditional_page(feed_etag)
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.select_related(
-        'author',
-        'group'
-    ).all()
+    post_list = Post.objects.for_feed()
+    page_obj = posts_per_page(request, post_list)
     context = {
-        'page_obj': posts_per_page(request, post_list),
+        'page_obj': page_obj,
+        'feed_cache': feed_cache(request, page_obj),
     }
     return render(request, template, context)
 
 
+@conditional_page(feed_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_feed()
     template = 'posts/group_list.html'
+    page_obj = posts_per_page(request, posts)
     context = {
         'group': group,
-        'page_obj': posts_per_page(request, posts),
+        'page_obj': page_obj,
+        'feed_cache': feed_cache(request, page_obj),
     }
     return render(request, template, context)
 
 
+@conditional_page(profile_etag)
 def profile(request, username):
-    author_post = get_object_or_404(User, username=username)
-    post_list = author_post.posts.all()
-    posts_count = post_list.count()
+    author_post = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    post_list = author_post.posts.for_feed()
     template = 'posts/profile.html'
     following = request.user.is_authenticated and request.user.follower.filter(
         author=author_post).exists()
+    page_obj = posts_per_page(request, post_list)
     context = {
         'author_post': author_post,
-        'page_obj': posts_per_page(request, post_list),
+        'page_obj': page_obj,
         'following': following,
-        'posts_count': posts_count,
+        'stats': author_stats(author_post),
+        'feed_cache': feed_cache(request, page_obj),
     }
     return render(request, template, context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    post_list = search_posts(query).for_feed()
+    context = {
+        'query': query,
+        'page_obj': posts_per_page(request, post_list),
+        'page_query': urlencode({'q': query}),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@conditional_page(post_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group').defer('text'),
+        pk=post_id
+    )
     template = 'posts/post_detail.html'
     form = CommentForm(
         request.POST or None
     )
-    comments = Comment.objects.filter(
-        post_id=post_id
-    )
     context = {
         'post': post,
         'form': form,
-        'comments': comments,
+        # Комментарии читаются, только если их фрагмента нет в кэше.
+        'comments': SimpleLazyObject(
+            lambda: comments_page(post.comments.select_related('author'))
+        ),
+        'post_cache': post_cache(post),
     }
     return render(request, template, context)
 
 
+@conditional_page(post_etag)
+def post_comments(request, post_id):
+    '''Фрагмент со следующей порцией комментариев для «Показать ещё».'''
+    post = get_object_or_404(Post, pk=post_id)
+    comments = comments_page(
+        post.comments.select_related('author'),
+        after=request.GET.get('after'),
+    )
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -69,9 +119,14 @@ def post_create(request):
         files=request.FILES or None
     )
     if form.is_valid():
-        post = form.save(commit=False)
-        post.author = request.user
-        form.save()
+        # Транзакция только вокруг записи: она сразу берёт блокировку
+        # записи базы, и держать её на проверке формы или рендеринге
+        # шаблона значит задерживать всех остальных писателей.
+        with transaction.atomic():
+            post = form.save(commit=False)
+            post.author = request.user
+            form.save()
+            enqueue(post.image)
         return redirect('posts:profile', post.author)
     context = {
         'form': form,
@@ -92,7 +147,10 @@ def post_edit(request, post_id):
     if post.author != request.user:
         return redirect('posts:profile', post.author)
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            form.save()
+            if 'image' in form.changed_data:
+                enqueue(post.image)
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -109,16 +167,15 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
     '''Передаем данные для страницы контекста'''
-    posts = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related('author', 'group')
+    posts = timeline_posts(request.user).for_feed()
     context = {
         'page_obj': posts_per_page(request, posts),
     }
@@ -130,15 +187,17 @@ def profile_follow(request, username):
     '''Подписка на автора'''
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        with transaction.atomic():
+            Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     '''Описка от автора'''
-    Follow.objects.filter(
-        author__username=username,
-        user=request.user
-    ).delete()
+    with transaction.atomic():
+        Follow.objects.filter(
+            author__username=username,
+            user=request.user
+        ).delete()
     return redirect('posts:profile', username=username)
@@ -0,0 +1,72 @@
+"""ASGI-точка входа для uvicorn и других ASGI-серверов.
+
+    uvicorn yatube.asgi:application
+
+Django 2.2 не умеет асинхронные вьюхи, поэтому ASGI-приложение
+оборачивает WSGI-обработчик: сервер сам дочитывает тело запроса
+и отдаёт ответ медленным клиентам в цикле событий, а вьюхи с ORM
+выполняются в пуле из ASGI_THREADS потоков, не блокируя цикл.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASGI_THREADS,
+    thread_name_prefix='asgi-view',
+)
+
+
+class ThreadPoolWsgiToAsgiInstance(WsgiToAsgiInstance):
+    # Сам asgiref запускает все WSGI-вызовы в одном потоке,
+    # и запросы процесса шли бы строго по очереди. Исходная функция
+    # берётся из внутренностей asgiref, поэтому его версия закреплена
+    # в requirements.txt, а путь проверяет core/tests/test_asgi.py.
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.__dict__['run_wsgi_app'].func,
+        thread_sensitive=False,
+        executor=executor,
+    )
+
+    def start_response(self, status, response_headers, exc_info=None):
+        # Django 2.2 отдаёт Set-Cookie с пробелом в начале значения
+        # (cookie.output(header='')). WSGI-серверы его терпят, а h11
+        # в uvicorn отклоняет такой ответ целиком.
+        return super().start_response(
+            status,
+            [(name, value.strip()) for name, value in response_headers],
+            exc_info,
+        )
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        instance = ThreadPoolWsgiToAsgiInstance(self.wsgi_application)
+        await instance(scope, receive, send)
+
+    @staticmethod
+    async def lifespan(receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = ThreadPoolWsgiToAsgi(get_wsgi_application())
+
+if settings.WARM_UP:
+    from core.warmup import warm_up
+    warm_up()
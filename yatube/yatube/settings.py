@@ -36,6 +36,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.routers.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -77,6 +78,9 @@ TEMPLATES = [
     },
 ]
 
+# Готовить шаблоны и URL при загрузке wsgi/asgi, до первого запроса.
+WARM_UP = False
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -87,6 +91,16 @@ DATABASES = {
     }
 }
 
+# Прагмы, которые core выполняет на каждом новом соединении с SQLite.
+SQLITE_PRAGMAS = {}
+
+# Алиасы реплик для чтения, см. core.routers. Пока их нет, всё идёт
+# в default. После записи чтения браузера REPLICA_PIN_SECONDS секунд
+# идут в default: реплика может ещё не получить изменения.
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_PIN_SECONDS = 15
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -132,3 +146,81 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POSTS_0N_PAGE = 10
+
+# Слов в анонсе поста в лентах и в заголовке страницы поста.
+POST_EXCERPT_WORDS = 30
+
+# Комментариев на странице поста и в каждой догрузке.
+COMMENTS_ON_PAGE = 20
+
+# Способ постраничного вывода для каждой ленты: 'offset' — номера страниц
+# (?page=), 'cursor' — курсоры по (pub_date, id) (?after=/?before=).
+PAGINATION_MODES = {
+    'index': 'offset',
+    'group_list': 'offset',
+    'profile': 'offset',
+    'follow_index': 'offset',
+}
+
+# Подписчиков у автора, больше которых его посты не раскладываются
+# по лентам при публикации, а подмешиваются при чтении ленты.
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Сколько последних постов автора добавлять в ленту при подписке.
+TIMELINE_BACKFILL_SIZE = 200
+
+# Сколько последних не разложенных постов автора раскладывать по лентам,
+# когда подписчиков у него снова не больше TIMELINE_FANOUT_LIMIT.
+# Работа в запросе отписки — до лимита подписчиков на это число.
+TIMELINE_REFILL_SIZE = 50
+
+# Срок жизни фрагментов лент в кэше. Изменения постов, групп
+# и пользователей сбрасывают фрагменты сразу через поколение лент.
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Срок жизни фрагментов страницы поста; изменения поста и комментариев
+# сбрасывают их сразу через Post.updated.
+POST_CACHE_TIMEOUT = 60 * 60
+
+# Размеры миниатюр картинок постов. Для каждого строятся все ширины
+# из widths в каждом формате из formats; последний формат — запасной
+# для браузеров без поддержки остальных. sizes уходит в атрибут sizes.
+THUMBNAIL_GEOMETRIES = {
+    'feed': {
+        'size': (960, 339),
+        'widths': (320, 640, 960),
+        'formats': ('WEBP', 'JPEG'),
+        'sizes': '(min-width: 1200px) 1110px, (min-width: 768px) 690px, '
+                 '100vw',
+        'options': {'crop': 'center', 'upscale': True, 'quality': 82},
+    },
+}
+
+# Строить миниатюры сразу при загрузке и отрисовке, без очереди.
+# В продакшене их строит `manage.py thumbnail_worker`.
+THUMBNAIL_PIPELINE_EAGER = DEBUG
+
+# Сколько раз воркер пробует построить миниатюры, прежде чем оставить
+# задание в очереди как неудавшееся, и через сколько секунд задание,
+# взятое упавшим воркером, снова считается свободным.
+THUMBNAIL_JOB_ATTEMPTS = 3
+THUMBNAIL_JOB_TIMEOUT = 10 * 60
+
+# Картинки больше FILE_UPLOAD_MAX_MEMORY_SIZE принимаются во временный
+# файл, а не в память воркера.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'posts.uploads.BoundedUploadHandler',
+]
+
+# Ограничения на картинку поста: размер файла и число пикселей
+# проверяются до декодирования. Картинки с большей стороной длиннее
+# POST_IMAGE_MAX_SIDE уменьшает конвейер миниатюр.
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 10 ** 6
+POST_IMAGE_MAX_SIDE = 2560
+
+# Потоков для вьюх под ASGI (yatube.asgi): столько запросов процесс
+# обрабатывает одновременно, медленные клиенты потоков не занимают.
+ASGI_THREADS = 32
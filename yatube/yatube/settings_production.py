@@ -0,0 +1,83 @@
+"""Настройки для запуска под gunicorn с несколькими воркерами.
+
+    DJANGO_SETTINGS_MODULE=yatube.settings_production \\
+        gunicorn --preload yatube.wsgi
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import (BASE_DIR, DATABASES, INSTALLED_APPS, MIDDLEWARE,
+                       TEMPLATES)
+
+DEBUG = False
+
+# Приложения только для разработки: без DEBUG они не работают, а их
+# импорт и middleware каждый воркер оплачивал бы временем старта
+# и памятью.
+DEV_APPS = ('debug_toolbar',)
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in DEV_APPS]
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware.split('.')[0] not in DEV_APPS
+]
+
+# Шаблоны читаются и компилируются один раз на процесс: кэширующий
+# загрузчик хранит их в памяти, а include и extends на каждом запросе
+# не ищут файлы заново.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+# Шаблоны и URL готовятся при загрузке wsgi (см. core.warmup),
+# с `gunicorn --preload` — один раз в мастере до fork воркеров.
+WARM_UP = True
+
+# Соединение живёт между запросами потока, а не открывается заново
+# (и не повторяет прагмы) на каждый запрос. Транзакции начинаются
+# с BEGIN IMMEDIATE, см. core.backends.sqlite3.
+DATABASES = {
+    'default': {
+        **DATABASES['default'],
+        'ENGINE': 'core.backends.sqlite3',
+        'CONN_MAX_AGE': 60,
+    },
+}
+
+# WAL: читатели не ждут писателей, а запись не копирует страницы
+# в отдельный журнал. В WAL synchronous=NORMAL не портит базу при
+# падении процесса и не делает fsync на каждый коммит. Файл читается
+# через mmap, кэш страниц соединения — 64 МБ, а писатель при занятой
+# базе ждёт до 5 секунд вместо немедленной ошибки.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+# Кэш общий для всех воркеров хоста: сброс поколения лент в одном
+# процессе сразу виден остальным.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    }
+}
+
+# Миниатюры строит `manage.py thumbnail_worker`, ленты их не создают.
+THUMBNAIL_PIPELINE_EAGER = False
@@ -0,0 +1,22 @@
+"""Продакшен-настройки с репликой для чтения во втором файле SQLite.
+
+Реплику обновляет отдельный процесс:
+
+    DJANGO_SETTINGS_MODULE=yatube.settings_replica \\
+        python manage.py sync_replicas --interval 5
+"""
+import os
+
+from .settings_production import *  # noqa: F401,F403
+from .settings_production import BASE_DIR, DATABASES
+
+DATABASES = {
+    **DATABASES,
+    'replica': {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, 'db-replica.sqlite3'),
+        # В тестах реплика — та же база, что и default.
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+DATABASE_REPLICAS = ['replica']